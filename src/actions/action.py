@@ -44,6 +44,15 @@ class Action:
                 if param not in args:
                     raise ValueError(f"Missing required parameter: {param}")
             
+            # Actions that run the agent again continue from the caller's depth,
+            # so recursion through them is bounded by max_depth
+            if getattr(self, "is_self_referential", False):
+                args = {
+                    **args,
+                    "current_depth": depth + 1,
+                    "max_depth": min(args.get("max_depth", max_depth), max_depth),
+                }
+            
             # Execute the tool with parsed arguments
             return self.execute_function(**args)
             
@@ -57,4 +66,12 @@ class Action:
         pass
 
     def add_context(self, agent):
-        pass
\ No newline at end of file
+        pass
+
+    def flush_pending(self):
+        """Hook for actions that buffer writes: persist them now, e.g. before a search."""
+        pass
+
+    def on_task_end(self):
+        """Hook called once the agent finishes a task."""
+        pass
@@ -1,9 +1,30 @@
 from typing import Any, TypeAlias
 from dataclasses import dataclass, field
+from uuid import uuid4
+import atexit
+import time
 from src.actions.action import Action, JsonDict
 from src.vector_store import VectorStore
 
 Metadata: TypeAlias = dict[str, str]
+KnowledgeItem: TypeAlias = dict[str, str | Metadata]
+
+DEFAULT_METADATA: Metadata = {"source": "user_input", "topic": "general"}
+
+METADATA_SCHEMA: JsonDict = {
+    "type": "object",
+    "description": "Additional metadata about the content",
+    "properties": {
+        "source": {
+            "type": "string",
+            "description": "Source of the information"
+        },
+        "topic": {
+            "type": "string",
+            "description": "Topic or category of the information"
+        }
+    }
+}
 
 @dataclass
 class Knowledge(Action):
@@ -12,7 +33,10 @@ class Knowledge(Action):
         "type": "function",
         "function": {
             "name": "add_knowledge",
-            "description": "Add new information to the knowledge base",
+            "description": (
+                "Add new information to the knowledge base. "
+                "Pass several facts at once with `items` instead of calling this tool repeatedly."
+            ),
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -20,51 +44,121 @@ class Knowledge(Action):
                         "type": "string",
                         "description": "The content to add to the knowledge base"
                     },
-                    "metadata": {
-                        "type": "object",
-                        "description": "Additional metadata about the content",
-                        "properties": {
-                            "source": {
-                                "type": "string",
-                                "description": "Source of the information"
+                    "metadata": METADATA_SCHEMA,
+                    "items": {
+                        "type": "array",
+                        "description": "A list of pieces of content to add in one call",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "content": {
+                                    "type": "string",
+                                    "description": "The content to add to the knowledge base"
+                                },
+                                "metadata": METADATA_SCHEMA
                             },
-                            "topic": {
-                                "type": "string",
-                                "description": "Topic or category of the information"
-                            }
+                            "required": ["content"]
                         }
                     }
-                },
-                "required": ["content"]
+                }
             }
         }
     })
-    
+    # Write-behind settings: pending documents are embedded and inserted in one
+    # batch once either threshold is reached, and whenever the agent finishes a task.
+    max_batch_size: int = 32
+    max_batch_age: float = 30.0  # seconds since the oldest pending document was queued
+
+    _pending_documents: list[str] = field(default_factory=list, init=False, repr=False)
+    _pending_metadatas: list[Metadata] = field(default_factory=list, init=False, repr=False)
+    _pending_ids: list[str] = field(default_factory=list, init=False, repr=False)
+    _oldest_pending: float | None = field(default=None, init=False, repr=False)
+    _exit_flush_registered: bool = field(default=False, init=False, repr=False)
+
     def add_context(self, agent):
         self._vector_store = agent.vector_store
+        if not self._exit_flush_registered:
+            atexit.register(self._flush_at_exit)
+            self._exit_flush_registered = True
+
+    def flush_pending(self):
+        self.flush()
 
-    def execute_function(self, content: str, metadata: Metadata | None = None) -> str:
+    def on_task_end(self):
+        self.flush()
+
+    def _flush_at_exit(self):
+        # The vector store's thread pool is already shut down when atexit
+        # handlers run, so write from this thread
+        try:
+            self.flush(concurrent=False)
+        except Exception as e:
+            print(f"Error writing {len(self._pending_documents)} queued document(s) at exit: {e}")
+
+    def execute_function(self,
+                         content: str | None = None,
+                         metadata: Metadata | None = None,
+                         items: list[KnowledgeItem] | None = None) -> str:
         """
-        Add new information to the knowledge base.
+        Queue new information for the knowledge base.
         
         Args:
             content: Content to add to the knowledge base
             metadata: Optional metadata about the content
+            items: Optional list of {"content", "metadata"} dicts to add in one call
             
         Returns:
-            Document ID of the added content
-        """
-        if metadata is None:
-            metadata = {"source": "user_input", "topic": "general"}
+            Document IDs of the added content
             
-        # Generate a unique document ID
-        doc_id = f"doc_{len(self._vector_store.list_collections())}"
-        
-        # Add the document to the vector store
-        self._vector_store.add_documents(
-            documents=[content],
-            metadatas=[metadata],
-            ids=[doc_id]
-        )
+        Raises:
+            ValueError: If neither content nor items are given
+        """
+        entries: list[KnowledgeItem] = list(items or [])
+        if content is not None:
+            entries.append({"content": content, "metadata": metadata})
+        if not entries:
+            raise ValueError("Either content or items must be provided")
+
+        doc_ids = [self._enqueue(entry["content"], entry.get("metadata")) for entry in entries]
+
+        flushed = self._should_flush() and self.flush() > 0
+        status = "Added" if flushed else "Queued"
+        return f"{status} {len(doc_ids)} document(s) with IDs: {', '.join(doc_ids)}"
+
+    def flush(self, concurrent: bool = True) -> int:
+        """
+        Embed and insert every pending document in a single batch. If the write
+        fails the documents stay queued for the next flush.
         
-        return f"Added document with ID: {doc_id}" 
\ No newline at end of file
+        Args:
+            concurrent: Let the vector store write shards on its thread pool
+            
+        Returns:
+            Number of documents written
+        """
+        if not self._pending_documents:
+            return 0
+
+        documents, metadatas, ids = self._pending_documents, self._pending_metadatas, self._pending_ids
+        self._vector_store.add_documents(documents=documents, metadatas=metadatas, ids=ids, concurrent=concurrent)
+
+        self._pending_documents, self._pending_metadatas, self._pending_ids = [], [], []
+        self._oldest_pending = None
+        return len(documents)
+
+    def _enqueue(self, content: str, metadata: Metadata | None) -> str:
+        # Ids are generated locally so queued documents never need a round-trip
+        # to the store and never collide with each other.
+        doc_id = f"doc_{uuid4().hex}"
+        self._pending_documents.append(content)
+        self._pending_metadatas.append(metadata or dict(DEFAULT_METADATA))
+        self._pending_ids.append(doc_id)
+        if self._oldest_pending is None:
+            self._oldest_pending = time.monotonic()
+        return doc_id
+
+    def _should_flush(self) -> bool:
+        if len(self._pending_documents) >= self.max_batch_size:
+            return True
+        return (self._oldest_pending is not None
+                and time.monotonic() - self._oldest_pending >= self.max_batch_age)
@@ -19,32 +19,60 @@ class Search(Action):
                         "type": "string",
                         "description": "The search query"
                     },
+                    "queries": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": (
+                            "Several phrasings of the search, run together in one call. "
+                            "Prefer this over calling the tool once per phrasing."
+                        )
+                    },
                     "n_results": {
                         "type": "integer",
                         "description": "Number of results to return",
                         "default": 3
                     }
                 },
-                "required": ["query"]
             }
         }
     })
+    fusion: str = "rrf"  # how hits from multiple queries are merged, see vector_store.merge_results
+    mmr_lambda: float | None = 0.7  # relevance vs. diversity trade-off for re-ranking, None disables it
 
     def add_context(self, agent):
         self._vector_store = agent.vector_store
+        # Write actions buffer documents until the task ends, flush them first
+        # so a search sees what was added earlier in the same task
+        self._flush_pending_writes = agent.flush_writes
 
-    def execute_function(self, query: str, n_results: int = 3) -> list[SearchResult]:
+    def execute_function(self,
+                         query: str | None = None,
+                         n_results: int = 3,
+                         queries: list[str] | None = None) -> list[SearchResult]:
         """
         Search for information in the vector database.
         
         Args:
             query: Search query string
             n_results: Number of results to return
+            queries: Optional list of query strings, merged into one deduplicated result list
             
         Returns:
             List of search results with content, metadata, and distance
+            
+        Raises:
+            ValueError: If neither query nor queries are given
         """
-        results = self._vector_store.search_similar(query, n_results=n_results)
+        all_queries = list(queries or [])
+        if query is not None:
+            all_queries.insert(0, query)
+        if not all_queries:
+            raise ValueError("Either query or queries must be provided")
+
+        self._flush_pending_writes()
+        search_input = all_queries[0] if len(all_queries) == 1 else all_queries
+        results = self._vector_store.search_similar(search_input, n_results=n_results,
+                                                    fusion=self.fusion, mmr_lambda=self.mmr_lambda)
         return [
             {
                 "content": doc,
@@ -32,13 +32,13 @@ class SubtaskExecutor(Action):
                     },
                     "model": {
                         "type": "string",
-                        "description": "The model to use for chat completion",
-                        "default": "gpt-4-1106-preview"
+                        "description": "Optional model to use for chat completion, by default one is picked per call stage",
+                        "optional": True
                     },
                     "max_depth": {
                         "type": "integer",
                         "description": "The maximum depth of tool calls to make",
-                        "default": 5 # TODO: make this enforceable
+                        "default": 5 # capped at the calling task's max_depth
                     }
                 },
                 "required": ["message"]
@@ -47,6 +47,8 @@ class SubtaskExecutor(Action):
     })
 
     def add_context(self, agent):
+        # Action.__call__ passes current_depth, so subtasks are nested tasks:
+        # depth limits apply and the router treats them as subtasks
         self.execute_function = agent.execute_task
 
     def execute_function(self, task_id: str, parameters: dict) -> Any:
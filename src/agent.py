@@ -7,25 +7,81 @@ from src.actions.action import Action
 from src.config.prompts import DEFAULT_SYSTEM_PROMPT
 from src.actions.subtask_executor import SubtaskExecutor
 from src.vector_store import VectorStore
+from src.semantic_cache import SemanticCache
+from src.routing import ModelRouter, TOOL_SELECTION, FINAL_ANSWER, SUBTASK
 
 load_dotenv()
 
 Message: TypeAlias = dict[str, str]
 ToolResult: TypeAlias = dict[str, Any]
-AgentResponse: TypeAlias = dict[str, str | list[ToolResult] | int | None]
+AgentResponse: TypeAlias = dict[str, str | list[ToolResult] | int | dict[str, int] | None]
 ToolCall: TypeAlias = Any
+Usage: TypeAlias = dict[str, int]
+
+def _usage(completion: ChatCompletion) -> Usage:
+    """Token usage of a completion as a plain dict."""
+    if completion.usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    return {
+        "prompt_tokens": completion.usage.prompt_tokens,
+        "completion_tokens": completion.usage.completion_tokens,
+        "total_tokens": completion.usage.total_tokens,
+    }
+
+def _add_usage(a: Usage, b: Usage) -> Usage:
+    return {key: a.get(key, 0) + b.get(key, 0) for key in a.keys() | b.keys()}
 
 class Agent:
-    def __init__(self, actions: list[Action]=[]) -> None:
-        """Initialize the agent with tools."""
+    def __init__(self,
+                 actions: list[Action]=[],
+                 semantic_cache: bool | SemanticCache = False,
+                 router: ModelRouter | None = None) -> None:
+        """
+        Initialize the agent with tools.
+        
+        Args:
+            actions: Tools the agent can call
+            semantic_cache: Reuse answers to paraphrases of earlier messages. Pass
+                True for the default settings or a configured SemanticCache
+            router: Picks the model per call stage, defaults to routing.DEFAULT_POLICY
+        """
         self.client = OpenAI()
+        self.router = router or ModelRouter(self.client)
         self.action_map: dict[str, Action] = {action.name: action for action in actions}
         self.vector_store = VectorStore()
+        if semantic_cache is True:
+            semantic_cache = SemanticCache(embed=self.vector_store.openai_ef)
+        self.semantic_cache: SemanticCache | None = semantic_cache or None
         self.add_context()
 
     def add_context(self):
         for action in self.action_map.values():
             action.add_context(self)
+
+    def _run_hooks(self, hook: str) -> bool:
+        """
+        Call an Action hook on every action. Errors are logged rather than raised
+        so they can't replace a task's result or exception, and buffered writes
+        stay queued for the next attempt.
+
+        Returns:
+            Whether every hook succeeded
+        """
+        ok = True
+        for action in self.action_map.values():
+            try:
+                getattr(action, hook)()
+            except Exception as e:
+                print(f"Error in {action.name}.{hook}: {e}")
+                ok = False
+        return ok
+
+    def flush_writes(self) -> bool:
+        """Persist writes that actions have buffered, so searches can see them."""
+        return self._run_hooks("flush_pending")
+
+    def end_task(self) -> bool:
+        return self._run_hooks("on_task_end")
             
     def _execute_tool(self, 
                      tool_call: Any, 
@@ -56,7 +112,7 @@ class Agent:
              message: str, 
              system_prompt: str | None = None,
              temperature: float = 0.7,
-             model: str = "o3-mini",
+             model: str | None = None,
              max_depth: int = 5,
              current_depth: int = 0) -> AgentResponse:
         """
@@ -66,12 +122,12 @@ class Agent:
             message: The user's message
             system_prompt: Optional system prompt to override default
             temperature: Temperature for response generation
-            model: The model to use for chat completion
+            model: Use this model for every call instead of routing per stage
             max_depth: Maximum allowed tool recursion depth
             current_depth: Current recursion depth
             
         Returns:
-            Dictionary containing response, tool calls, and depth info
+            Dictionary containing response, tool calls, depth and token usage info
         """
         if current_depth >= max_depth:
             return {
@@ -80,6 +136,30 @@ class Agent:
                 "error": "max_depth_exceeded"
             }
             
+        # Only top-level tasks are cached, subtasks are part of a larger answer
+        use_cache = self.semantic_cache is not None and current_depth == 0
+        if use_cache:
+            config_key = (model, system_prompt, temperature, max_depth, tuple(sorted(self.action_map)))
+            cached, embedding = self.semantic_cache.lookup(message, config_key, self.vector_store.version())
+            if cached is not None:
+                return cached
+
+        try:
+            result = self._run_task(message, system_prompt, model, current_depth, max_depth)
+        finally:
+            ended = self.end_task()
+
+        if use_cache and ended and "error" not in result:
+            # After end_task, so knowledge added by this task is already part of the version
+            self.semantic_cache.store(embedding, result, config_key, self.vector_store.version())
+        return result
+
+    def _run_task(self,
+                  message: str,
+                  system_prompt: str | None,
+                  model: str | None,
+                  current_depth: int,
+                  max_depth: int) -> AgentResponse:
         if system_prompt is None:
             system_prompt = DEFAULT_SYSTEM_PROMPT
             
@@ -89,7 +169,8 @@ class Agent:
         ]
         
         # First call to get tool selection
-        response: ChatCompletion = self.client.chat.completions.create(
+        response: ChatCompletion = self.router.complete(
+            TOOL_SELECTION,
             model=model,
             messages=messages,
             tools=[tool.config for tool in self.action_map.values()],
@@ -99,9 +180,18 @@ class Agent:
 
         message_obj: ChatCompletionMessage = response.choices[0].message
         
+        usage = _usage(response)
+        
         # Base caseIf no tool calls, return direct response
         if not hasattr(message_obj, 'tool_calls') or not message_obj.tool_calls:
-            return {"response": message_obj.content, "tool_calls": None}
+            # A top-level answer still comes from the final-answer model, even
+            # when the fast tool-selection model decided no tool is needed. The
+            # fast call is then extra cost, not a saving, in the router's report
+            if current_depth == 0 and model is None and not self.router.serves(FINAL_ANSWER, self.router.last_model):
+                response = self.router.complete(FINAL_ANSWER, messages=messages, redoes=TOOL_SELECTION)
+                message_obj = response.choices[0].message
+                usage = _add_usage(usage, _usage(response))
+            return {"response": message_obj.content, "tool_calls": None, "usage": usage}
         tool_results: list[ToolResult] = self._handle_tool_calls(message_obj.tool_calls, current_depth, max_depth)
         # Get final response with tool results
         messages.extend([
@@ -109,7 +199,9 @@ class Agent:
             # {"role": "function", "content": str(tool_results), "name": "function_results"}
         ])
         
-        final_response: ChatCompletion = self.client.chat.completions.create(
+        # Subtasks are one step of a larger answer and don't need the strongest model
+        final_response: ChatCompletion = self.router.complete(
+            FINAL_ANSWER if current_depth == 0 else SUBTASK,
             model=model,
             messages=messages,
             # temperature=temperature
@@ -118,7 +210,8 @@ class Agent:
         return {
             "response": final_response.choices[0].message.content,
             "tool_calls": tool_results,
-            "depth": current_depth
+            "depth": current_depth,
+            "usage": _add_usage(usage, _usage(final_response))
         }
     
     def _handle_tool_calls(self, tool_calls: list[ToolCall], current_depth: int, max_depth: int) -> list[ToolResult]:
@@ -140,3 +233,4 @@ class Agent:
                     "function": tool_call.function.name,
                     "error": str(e)
                 })
+        return tool_results
@@ -0,0 +1,90 @@
+import numpy as np
+
+# Transcript windows are built from `kernel_size` consecutive paragraphs (see
+# scripts/add_knowledge.py), so chunks closer than this within an episode overlap.
+ADJACENCY_WINDOW = 3
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def adjacency_matrix(metadatas, window: int = ADJACENCY_WINDOW) -> np.ndarray:
+    """
+    Boolean matrix marking pairs of chunks whose sliding windows overlap, i.e.
+    chunks from the same episode less than `window` chunks apart. Documents
+    without episode metadata are never adjacent to anything.
+    """
+    n = len(metadatas)
+    episodes = [(meta or {}).get("episode_number") for meta in metadatas]
+    chunks = np.full(n, np.nan)
+    for i, meta in enumerate(metadatas):
+        try:
+            chunks[i] = float((meta or {})["episode_chunk_number"])
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    _, episode_codes = np.unique(np.array([str(e) for e in episodes]), return_inverse=True)
+    has_episode = np.array([e is not None for e in episodes]) & ~np.isnan(chunks)
+    same_episode = episode_codes[:, None] == episode_codes[None, :]
+    close = np.abs(chunks[:, None] - chunks[None, :]) < window
+    adjacent = same_episode & close & has_episode[:, None] & has_episode[None, :]
+    np.fill_diagonal(adjacent, False)
+    return adjacent
+
+def mmr_select(query_embeddings, candidate_embeddings, k: int, lambda_mult: float = 0.7,
+               adjacent: np.ndarray | None = None) -> list[int]:
+    """
+    Greedy Maximal Marginal Relevance selection.
+
+    Picks `k` candidate indices maximizing
+        lambda * relevance - (1 - lambda) * max similarity to already picked
+    where relevance is the best cosine similarity to any of the queries.
+    Candidates flagged in `adjacent` to an already picked one (overlapping
+    windows) are only picked once the rest of the pool is exhausted.
+    """
+    candidates = _normalize(np.asarray(candidate_embeddings, dtype=np.float32))
+    queries = _normalize(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+    n = len(candidates)
+    k = min(k, n)
+    if k == 0:
+        return []
+
+    relevance = (candidates @ queries.T).max(axis=1)
+    similarity = candidates @ candidates.T
+    if adjacent is None:
+        adjacent = np.zeros((n, n), dtype=bool)
+
+    available = np.ones(n, dtype=bool)
+    suppressed = np.zeros(n, dtype=bool)
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    selected: list[int] = []
+
+    while len(selected) < k:
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        if (available & ~suppressed).any():
+            scores[suppressed] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        suppressed |= adjacent[best]
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+    return selected
+
+def mmr_rerank(results, query_embeddings, n_results: int = 3, lambda_mult: float = 0.7,
+               adjacency_window: int = ADJACENCY_WINDOW):
+    """
+    Re-rank a single-query Chroma result (queried with embeddings included)
+    down to a diverse top `n_results`. Returns the same shape without embeddings.
+    """
+    metadatas = results["metadatas"][0]
+    adjacent = adjacency_matrix(metadatas, adjacency_window) if adjacency_window else None
+    order = mmr_select(query_embeddings, results["embeddings"][0], n_results, lambda_mult, adjacent)
+    return {
+        key: [[results[key][0][i] for i in order]]
+        for key in ("ids", "documents", "metadatas", "distances")
+    }
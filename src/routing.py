@@ -0,0 +1,194 @@
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+from openai.types.chat import ChatCompletion
+
+TOOL_SELECTION = "tool_selection"
+FINAL_ANSWER = "final_answer"
+SUBTASK = "subtask"
+
+# Models to try per call stage, cheapest first. A later model is only used when
+# the earlier one fails or its output looks unusable (see `is_low_confidence`).
+DEFAULT_POLICY: dict[str, list[str]] = {
+    TOOL_SELECTION: ["gpt-4o-mini", "o3-mini"],
+    SUBTASK: ["gpt-4o-mini", "o3-mini"],
+    FINAL_ANSWER: ["o3-mini"],
+}
+BASELINE_MODEL = "o3-mini"  # what every call used before routing, savings are reported against it
+
+# USD per million (prompt, completion) tokens, used to price the savings in `report`
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "o3-mini": (1.10, 4.40),
+    "gpt-4-1106-preview": (10.00, 30.00),
+}
+
+def cost(model: str, prompt_tokens: int, completion_tokens: int, prices: dict[str, tuple[float, float]] = MODEL_PRICES) -> float | None:
+    """Price of a call in USD, None for models missing from the price table."""
+    if model not in prices:
+        return None
+    prompt_price, completion_price = prices[model]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+def is_low_confidence(response: ChatCompletion, tool_names: set[str] | None = None) -> bool:
+    """
+    Whether a completion should be retried on a stronger model: it was cut off,
+    it is empty, or it calls a tool that doesn't exist or with arguments that
+    aren't valid JSON.
+    """
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        return True
+    message = choice.message
+    if not message.tool_calls:
+        return not (message.content or "").strip()
+    for tool_call in message.tool_calls:
+        if tool_names is not None and tool_call.function.name not in tool_names:
+            return True
+        try:
+            json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError:
+            return True
+    return False
+
+@dataclass
+class ModelRouter:
+    """
+    Picks the model for each chat completion from a per-stage policy and
+    escalates to the next model in the stage's list on errors or low-confidence
+    output. Latency and token usage are recorded per stage and model, see `report`.
+    """
+    client: Any
+    policy: dict[str, list[str]] = field(default_factory=lambda: {stage: list(models) for stage, models in DEFAULT_POLICY.items()})
+    baseline_model: str = BASELINE_MODEL
+    prices: dict[str, tuple[float, float]] = field(default_factory=lambda: dict(MODEL_PRICES))
+    last_model: str | None = field(default=None, init=False)  # model that served the latest completion
+
+    # served_* count the tokens of the calls that answered a request, the one
+    # call the baseline would have made instead. Escalated calls are extra.
+    _calls: dict[tuple[str, str], dict[str, float]] = field(
+        default_factory=lambda: defaultdict(lambda: {
+            "calls": 0, "latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "failures": 0,
+            "served_prompt_tokens": 0, "served_completion_tokens": 0,
+        }),
+        init=False, repr=False
+    )
+    _escalations: dict[str, int] = field(default_factory=lambda: defaultdict(int), init=False, repr=False)
+    _requests: dict[str, int] = field(default_factory=lambda: defaultdict(int), init=False, repr=False)
+    _redone: dict[str, int] = field(default_factory=lambda: defaultdict(int), init=False, repr=False)
+    _last_served: tuple[str, str, int, int] | None = field(default=None, init=False, repr=False)
+
+    def complete(self, stage: str, model: str | None = None, redoes: str | None = None, **kwargs) -> ChatCompletion:
+        """
+        Create a chat completion for a call stage.
+
+        Args:
+            stage: Key of the policy, e.g. TOOL_SELECTION or FINAL_ANSWER
+            model: Use exactly this model instead of the policy, without escalation
+            redoes: Stage of the previous request if this one replaces its answer.
+                The baseline would only have made this request, so the previous
+                one is reported as extra cost and latency rather than savings
+            kwargs: Passed on to `chat.completions.create`
+
+        Raises:
+            Exception: The last model's error if every model in the stage failed
+        """
+        if redoes is not None:
+            self._redo(redoes)
+        models = [model] if model else self.policy[stage]
+        self._requests[stage] += 1
+        tool_names = {tool["function"]["name"] for tool in kwargs.get("tools", [])} or None
+        for i, candidate in enumerate(models):
+            is_last = i == len(models) - 1
+            stats = self._calls[(stage, candidate)]
+            start = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(model=candidate, **kwargs)
+            except Exception:
+                stats["failures"] += 1
+                stats["latency"] += time.perf_counter() - start
+                if is_last:
+                    raise
+                self._escalations[stage] += 1
+                continue
+            stats["calls"] += 1
+            stats["latency"] += time.perf_counter() - start
+            prompt_tokens, completion_tokens = (
+                (response.usage.prompt_tokens, response.usage.completion_tokens) if response.usage else (0, 0)
+            )
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+
+            if not is_last and is_low_confidence(response, tool_names):
+                self._escalations[stage] += 1
+                continue
+            stats["served_prompt_tokens"] += prompt_tokens
+            stats["served_completion_tokens"] += completion_tokens
+            self.last_model = candidate
+            self._last_served = (stage, candidate, prompt_tokens, completion_tokens)
+            return response
+
+    def _redo(self, stage: str) -> None:
+        """Stop counting the previous request of `stage` as one the baseline would have made."""
+        if self._last_served is None or self._last_served[0] != stage:
+            return
+        _, model, prompt_tokens, completion_tokens = self._last_served
+        stats = self._calls[(stage, model)]
+        stats["served_prompt_tokens"] -= prompt_tokens
+        stats["served_completion_tokens"] -= completion_tokens
+        self._redone[stage] += 1
+        self._last_served = None
+
+    def serves(self, stage: str, model: str | None) -> bool:
+        """Whether `model` is one the policy would use for `stage`."""
+        return model in self.policy[stage]
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        """
+        Per stage: requests, escalations, redone requests, calls, latency, tokens
+        and cost, the same per model, and the savings against sending every
+        request to `baseline_model`, which would have made one call per request
+        that wasn't redone:
+
+        - cost_saved prices the tokens of the calls that answered those requests
+          at the baseline model's rates, minus what every call actually cost
+          (None if a model has no price)
+        - latency_saved assumes the baseline model's average latency per call
+          across all stages (None until it has been called at least once)
+
+        Escalated, failed and redone calls are included in the actual cost and
+        latency, so they count against the savings.
+        """
+        baseline_calls = [stats for (_, model), stats in self._calls.items()
+                          if model == self.baseline_model and stats["calls"]]
+        baseline_latency = (sum(stats["latency"] for stats in baseline_calls)
+                            / sum(stats["calls"] + stats["failures"] for stats in baseline_calls)) if baseline_calls else None
+
+        report: dict[str, dict[str, Any]] = {}
+        for (stage, model), stats in self._calls.items():
+            entry = report.setdefault(stage, {
+                "requests": self._requests[stage], "escalations": self._escalations[stage],
+                "redone": self._redone[stage], "calls": 0, "latency": 0.0, "tokens": 0, "models": {}
+            })
+            entry["calls"] += stats["calls"]
+            entry["latency"] += stats["latency"]
+            entry["tokens"] += stats["prompt_tokens"] + stats["completion_tokens"]
+            entry["models"][model] = {
+                **stats,
+                "cost": cost(model, stats["prompt_tokens"], stats["completion_tokens"], self.prices),
+                "baseline_cost": cost(self.baseline_model, stats["served_prompt_tokens"],
+                                      stats["served_completion_tokens"], self.prices),
+            }
+
+        for entry in report.values():
+            costs = [stats["cost"] for stats in entry["models"].values()]
+            baseline_costs = [stats.pop("baseline_cost") for stats in entry["models"].values()]
+            priced = None not in costs and None not in baseline_costs
+            entry["cost"] = sum(costs) if priced else None
+            entry["cost_saved"] = sum(baseline_costs) - sum(costs) if priced else None
+            entry["latency_saved"] = (None if baseline_latency is None
+                                      else (entry["requests"] - entry["redone"]) * baseline_latency - entry["latency"])
+        return report
@@ -1,5 +1,7 @@
 from src.vector_store import VectorStore
-from src.scripts.transcripts_utils import get_files, Transcript, parse_file_name
+from src.scripts.transcripts_utils import iter_files, Transcript, parse_file_name
+
+INGEST_BATCH_SIZE = 10000  # documents buffered across transcripts before writing
 
 
 def transcript_to_documents_metadatas(transcript: Transcript, kernel_size: int = 3):
@@ -27,13 +29,22 @@ if __name__ == "__main__":
         transcripts_path = "./test_transcripts"
 
     vector_store = VectorStore()
-    transcripts = get_files(transcripts_path)
+    transcripts = iter_files(transcripts_path)
     chunk_lens = []
     episode_lens = []
+    # Several episodes per write so add_documents can embed and insert them
+    # on different shards concurrently
+    batch_documents, batch_metadatas = [], []
     for transcript in transcripts:
         print(f"title: {transcript['episode_title']} length: {len(transcript['content'])}")
         chunk_lens = []
         documents, metadatas = transcript_to_documents_metadatas(transcript)
         chunk_lens.extend([len(chunk) for chunk in documents])
         episode_lens.append(sum(chunk_lens))
-        vector_store.add_documents(documents, metadatas)
+        batch_documents.extend(documents)
+        batch_metadatas.extend(metadatas)
+        if len(batch_documents) >= INGEST_BATCH_SIZE:
+            vector_store.add_documents(batch_documents, batch_metadatas)
+            batch_documents, batch_metadatas = [], []
+    if batch_documents:
+        vector_store.add_documents(batch_documents, batch_metadatas)
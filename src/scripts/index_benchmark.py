@@ -0,0 +1,127 @@
+"""
+Measure recall and latency of HNSW settings on the stored embeddings.
+
+Exact top-k neighbours are computed with NumPy as ground truth, then every
+combination of settings is built in a throwaway in-memory Chroma collection and
+queried with the same sample.
+
+    python -m src.scripts.index_benchmark --M 16 32 --construction-ef 100 200 --search-ef 10 50 100
+"""
+import argparse
+import itertools
+import time
+from uuid import uuid4
+import chromadb
+import numpy as np
+import pandas as pd
+from src.snapshot import iter_collection
+from src.vector_store import VectorStore, index_metadata, shard_names
+
+def load_embeddings(vector_store: VectorStore, collection_name: str, limit: int | None,
+                    batch_size: int = 5000) -> np.ndarray:
+    """Page the stored embeddings into one float32 matrix, converting each page as it arrives."""
+    shards = [vector_store.client.get_collection(name=name, embedding_function=vector_store.openai_ef)
+              for name in shard_names(collection_name, vector_store.num_shards)]
+    total = sum(shard.count() for shard in shards)
+    if limit is not None:
+        total = min(total, limit)
+
+    data = None
+    filled = 0
+    for shard in shards:
+        for batch in iter_collection(shard, batch_size, include=("embeddings",)):
+            if filled >= total:
+                break
+            embeddings = np.asarray(batch["embeddings"][:total - filled], dtype=np.float32)
+            if data is None:
+                data = np.empty((total, embeddings.shape[1]), dtype=np.float32)
+            data[filled:filled + len(embeddings)] = embeddings
+            filled += len(embeddings)
+    return data[:filled] if data is not None else np.zeros((0, 0), dtype=np.float32)
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """Indices of the exact `k` nearest rows of `data` for every query, nearest first."""
+    if space == "cosine":
+        data = data / np.linalg.norm(data, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        distances = -queries @ data.T
+    elif space == "ip":
+        distances = -queries @ data.T
+    else:
+        # ||q - d||^2 without materializing the differences
+        distances = (queries ** 2).sum(axis=1)[:, None] - 2 * queries @ data.T + (data ** 2).sum(axis=1)[None, :]
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+def recall_at_k(found: list[list[int]], truth: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(expected)) for row, expected in zip(found, truth.tolist()))
+    return hits / truth.size
+
+def estimated_index_bytes(n: int, dimension: int, m: int) -> int:
+    """hnswlib keeps the float32 vectors plus about 2*M neighbour links of 4 bytes per element."""
+    return n * (dimension * 4 + 2 * m * 4)
+
+def benchmark(client, data: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int, index_params: dict) -> dict:
+    collection = client.create_collection(name=f"benchmark_{uuid4().hex}", metadata=index_metadata(index_params))
+    try:
+        ids = [str(i) for i in range(len(data))]
+        start = time.perf_counter()
+        for offset in range(0, len(data), 5000):
+            collection.add(ids=ids[offset:offset + 5000], embeddings=data[offset:offset + 5000].tolist())
+        build_time = time.perf_counter() - start
+
+        latencies = []
+        found = []
+        for query in queries:
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append(time.perf_counter() - start)
+            found.append([int(i) for i in result["ids"][0]])
+    finally:
+        client.delete_collection(name=collection.name)
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        **index_params,
+        f"recall@{k}": recall_at_k(found, truth),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "build_s": build_time,
+        "est_index_mb": estimated_index_bytes(len(data), data.shape[1], index_params["M"]) / 2**20,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default="default_collection")
+    parser.add_argument("--limit", type=int, default=None, help="Only use this many stored embeddings")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled query vectors")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--space", choices=["cosine", "l2", "ip"], default="l2")
+    parser.add_argument("--M", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = load_embeddings(VectorStore(), args.collection, args.limit)
+    if len(data) <= args.k:
+        raise SystemExit(f"Need more than {args.k} stored embeddings, found {len(data)}")
+    rng = np.random.default_rng(args.seed)
+    # Perturb the sampled vectors slightly so queries aren't exact copies of stored points
+    queries = data[rng.choice(len(data), size=min(args.queries, len(data)), replace=False)]
+    queries = queries + rng.normal(scale=queries.std() * 0.05, size=queries.shape).astype(np.float32)
+
+    start = time.perf_counter()
+    truth = exact_top_k(data, queries, args.k, args.space)
+    print(f"{len(data)} vectors of dimension {data.shape[1]}, exact top-{args.k} "
+          f"for {len(queries)} queries in {time.perf_counter() - start:.2f}s")
+
+    client = chromadb.EphemeralClient()
+    rows = []
+    for m, construction_ef, search_ef in itertools.product(args.M, args.construction_ef, args.search_ef):
+        params = {"space": args.space, "M": m, "construction_ef": construction_ef, "search_ef": search_ef}
+        rows.append(benchmark(client, data, queries, truth, args.k, params))
+        print(rows[-1])
+
+    print(pd.DataFrame(rows).sort_values("p50_ms").to_string(index=False, float_format="%.3f"))
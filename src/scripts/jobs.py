@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+from functools import partial
+from multiprocessing import Process
+from src import jobs
+
+# Same setting as src.vector_store, read here so the CLI doesn't import chromadb
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+
+
+def make_agent(read_only: bool = False):
+    """
+    Build a worker's agent. Read-only agents leave out add_knowledge: several
+    worker processes writing to one local chroma_db would corrupt its index,
+    so that needs a Chroma server (CHROMA_HOST).
+    """
+    # Imported here so the CLI can enqueue/inspect without an OpenAI key
+    from src.agent import Agent
+    from src.actions.add_knowledge import Knowledge
+    from src.actions.retrieve_knowledge import Search
+    actions = [Search()] if read_only else [Knowledge(), Search()]
+    return Agent(actions=actions)
+
+
+def enqueue(args):
+    engine = jobs.get_engine(args.database_url)
+    messages = list(args.messages)
+    if args.transcripts:
+        from src.scripts.run_query import TEST_QUERY_1
+        from src.scripts.transcripts_utils import iter_files
+        messages.extend(TEST_QUERY_1 + transcript["content"] for transcript in iter_files(args.transcripts))
+    for message in messages:
+        job_id = jobs.enqueue(engine, message, max_attempts=args.max_attempts)
+        print(f"Enqueued job {job_id}: {message[:60]!r}")
+
+
+def work(args):
+    read_only = args.workers > 1 and not CHROMA_HOST
+    if read_only:
+        print("Several workers without CHROMA_HOST: running without add_knowledge to protect ./chroma_db")
+    worker_args = dict(agent_factory=partial(make_agent, read_only),
+                       url=args.database_url, stop_when_empty=args.stop_when_empty)
+    if args.workers == 1:
+        jobs.run_worker(**worker_args)
+        return
+    processes = [Process(target=jobs.run_worker, kwargs=worker_args) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def status(args):
+    engine = jobs.get_engine(args.database_url)
+    for job_status, count in jobs.count_by_status(engine).items():
+        print(f"{job_status}: {count}")
+
+
+def show(args):
+    job = jobs.get_job(jobs.get_engine(args.database_url), args.job_id)
+    if job is None:
+        print(f"No job with ID: {args.job_id}")
+        return
+    print(json.dumps(job.to_dict(), indent=2, default=str))
+
+
+def retry(args):
+    if jobs.retry(jobs.get_engine(args.database_url), args.job_id):
+        print(f"Re-queued job {args.job_id}")
+    else:
+        print(f"No failed job with ID: {args.job_id}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queue and run Agent.execute_task jobs in Postgres")
+    parser.add_argument("--database-url", default=jobs.DATABASE_URL)
+    commands = parser.add_subparsers(required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="Add tasks to the queue")
+    enqueue_parser.add_argument("messages", nargs="*", help="Messages to run")
+    enqueue_parser.add_argument("--transcripts", help="Enqueue the research-question query for every transcript in this folder")
+    enqueue_parser.add_argument("--max-attempts", type=int, default=3)
+    enqueue_parser.set_defaults(func=enqueue)
+
+    work_parser = commands.add_parser(
+        "work",
+        help="Run worker processes. With more than one and no CHROMA_HOST, workers can't add knowledge"
+    )
+    work_parser.add_argument("--workers", type=int, default=1)
+    work_parser.add_argument("--stop-when-empty", action="store_true")
+    work_parser.set_defaults(func=work)
+
+    status_parser = commands.add_parser("status", help="Count jobs by status")
+    status_parser.set_defaults(func=status)
+
+    show_parser = commands.add_parser("show", help="Print a job and its result")
+    show_parser.add_argument("job_id", type=int)
+    show_parser.set_defaults(func=show)
+
+    retry_parser = commands.add_parser("retry", help="Re-queue a failed job")
+    retry_parser.add_argument("job_id", type=int)
+    retry_parser.set_defaults(func=retry)
+
+    args = parser.parse_args()
+    args.func(args)
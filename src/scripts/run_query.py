@@ -2,7 +2,7 @@ from src.agent import Agent
 from src.actions.add_knowledge import Knowledge
 from src.actions.retrieve_knowledge import Search
 import re
-from src.scripts.transcripts_utils import get_files
+from src.scripts.transcripts_utils import iter_files
 
 
 TEST_QUERY_1 = """
@@ -21,11 +21,12 @@ TEST_QUERY_2 = "Given the transcripts of the episode below what is the most effe
 def run_query():
     # initialize agent with tools
     agent = Agent(actions=[Knowledge(), Search()])
-    for transcript in get_files("./test_transcripts"):
+    for transcript in iter_files("./test_transcripts"):
         print(f"title: {transcript['episode_title']} length: {len(transcript['content'])}")
         query = TEST_QUERY_1 + transcript['content']
         query_result = agent.execute_task(query)
         print(f"Query Response: {query_result['response']}")
+    print(f"Model routing: {agent.router.report()}")
 
 if __name__ == "__main__":
     run_query() 
\ No newline at end of file
@@ -1,7 +1,14 @@
-from typing import TypedDict
+from typing import Iterator, TypedDict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+import hashlib
+import json
 import os
 from docx import Document
 
+# Parsed transcripts are cached here, see iter_files
+CACHE_DIR = "./.transcript_cache"
+
 class Transcript(TypedDict):
     episode_number: str
     episode_title: str
@@ -12,20 +19,100 @@ def read_docx(path: str) -> str:
     paragraphs = [para.text for para in doc.paragraphs]
     return "\n".join(paragraphs)
 
-def get_files(path: str) -> list[Transcript]:
-    """Given a path, get all the files in the folder along with their content."""
-    files_with_content = []
-    files = [f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))]
-    for file in files:
-        try:
-            content = read_docx(os.path.join(path, file))
-            files_with_content.append({
-                **parse_file_name(file),
-                "content": content
-            })
-        except Exception as e:
-            print(f"Error reading file {file}: {e}")
-    return files_with_content
+def get_files(path: str, cache_dir: str | None = None) -> list[Transcript]:
+    """
+    Given a path, get all the files in the folder along with their content.
+    Pass a `cache_dir` to reuse parsed transcripts, see iter_files.
+    """
+    return list(iter_files(path, cache_dir=cache_dir))
+
+
+def iter_files(path: str,
+               max_workers: int | None = None,
+               cache_dir: str | None = CACHE_DIR) -> Iterator[Transcript]:
+    """
+    Lazily yield the transcripts in a folder as they are parsed.
+
+    Files are parsed in a process pool and yielded in completion order, with at
+    most a couple of batches in flight so the whole archive is never held in
+    memory. Parsed transcripts are cached in `cache_dir` keyed by path, size and
+    mtime, so unchanged files are not parsed again. Pass cache_dir=None to disable.
+    """
+    files = [os.path.join(path, f) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))]
+    to_parse = []
+    for file_path in files:
+        cached = _read_cache(cache_dir, file_path)
+        if cached is not None:
+            yield cached
+        else:
+            to_parse.append(file_path)
+
+    if not to_parse:
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = 2 * max_workers
+    pending_files = iter(to_parse)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {executor.submit(parse_transcript, f): f for f in islice(pending_files, max_in_flight)}
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path = in_flight.pop(future)
+                try:
+                    transcript = future.result()
+                except Exception as e:
+                    print(f"Error reading file {os.path.basename(file_path)}: {e}")
+                else:
+                    _write_cache(cache_dir, file_path, transcript)
+                    yield transcript
+            for file_path in islice(pending_files, len(done)):
+                in_flight[executor.submit(parse_transcript, file_path)] = file_path
+
+
+def parse_transcript(file_path: str) -> Transcript:
+    """Read a single transcript file. Runs in the worker processes of `iter_files`."""
+    return {
+        **parse_file_name(os.path.basename(file_path)),
+        "content": read_docx(file_path)
+    }
+
+
+def _cache_file(cache_dir: str, file_path: str) -> str | None:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    key = f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+
+def _read_cache(cache_dir: str | None, file_path: str) -> Transcript | None:
+    if cache_dir is None:
+        return None
+    cache_file = _cache_file(cache_dir, file_path)
+    if cache_file is None or not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading cache for {os.path.basename(file_path)}: {e}")
+        return None
+
+
+def _write_cache(cache_dir: str | None, file_path: str, transcript: Transcript) -> None:
+    if cache_dir is None:
+        return
+    cache_file = _cache_file(cache_dir, file_path)
+    if cache_file is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temp file first so an interrupted run never leaves a truncated entry
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(transcript, f, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
 
 
 def parse_file_name(file_name: str) -> dict[str, str]:
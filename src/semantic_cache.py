@@ -0,0 +1,113 @@
+import copy
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+import numpy as np
+
+Embedder = Callable[[list[str]], list[list[float]]]
+
+@dataclass
+class CacheEntry:
+    config_key: Hashable
+    response: dict[str, Any]
+    created_at: float
+    knowledge_version: Any
+
+@dataclass
+class SemanticCache:
+    """
+    Answer cache keyed by the meaning of the message rather than its exact text.
+
+    Messages are embedded and compared by cosine similarity against earlier
+    messages asked with the same configuration (model, prompt, tools, ...). A
+    cached response is returned when the best match reaches `threshold`, it is
+    younger than `ttl` seconds and the knowledge base hasn't changed since.
+    Matches between `near_miss_threshold` and `threshold` are counted
+    separately to help tune the threshold.
+    """
+    embed: Embedder
+    threshold: float = 0.95
+    near_miss_threshold: float = 0.90
+    ttl: float = 24 * 60 * 60
+    max_entries: int = 1000
+    max_message_chars: int = 8000  # longer messages exceed the embedding model's input limit and are not cached
+
+    _entries: list[CacheEntry] = field(default_factory=list, init=False, repr=False)
+    _embeddings: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.float32), init=False, repr=False)
+    stats: dict[str, int] = field(default_factory=lambda: {
+        "hits": 0, "misses": 0, "near_misses": 0, "expired": 0, "invalidated": 0, "skipped": 0,
+    }, init=False)
+
+    def _embed(self, message: str) -> np.ndarray | None:
+        if len(message) > self.max_message_chars:
+            return None
+        try:
+            vector = np.asarray(self.embed([message])[0], dtype=np.float32)
+        except Exception as e:
+            print(f"Error embedding message for the semantic cache: {e}")
+            return None
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, message: str, config_key: Hashable, knowledge_version: Any = None) -> tuple[dict[str, Any] | None, np.ndarray | None]:
+        """
+        Find a cached response for a message.
+
+        Returns:
+            The cached response (or None on a miss) and the message embedding,
+            which can be passed to `store` to avoid embedding the message twice
+        """
+        embedding = self._embed(message)
+        if embedding is None:
+            self.stats["skipped"] += 1
+            return None, None
+
+        self._evict(knowledge_version)
+        candidates = [i for i, entry in enumerate(self._entries) if entry.config_key == config_key]
+        if not candidates:
+            self.stats["misses"] += 1
+            return None, embedding
+
+        similarities = self._embeddings[candidates] @ embedding
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            self.stats["near_misses" if similarity >= self.near_miss_threshold else "misses"] += 1
+            return None, embedding
+
+        self.stats["hits"] += 1
+        response = copy.deepcopy(self._entries[candidates[best]].response)
+        response["cache"] = {"similarity": similarity}
+        if response.get("usage"):
+            # Nothing was spent on this answer, don't let cost reports count it again
+            response["usage"] = {key: 0 for key in response["usage"]}
+        return response, embedding
+
+    def store(self, embedding: np.ndarray | None, response: dict[str, Any], config_key: Hashable, knowledge_version: Any = None) -> None:
+        if embedding is None:
+            return
+        if len(self._entries) >= self.max_entries:
+            # Drop the oldest entry
+            self._entries.pop(0)
+            self._embeddings = self._embeddings[1:]
+        self._entries.append(CacheEntry(config_key, copy.deepcopy(response), time.monotonic(), knowledge_version))
+        rows = self._embeddings if len(self._embeddings) else np.zeros((0, len(embedding)), dtype=np.float32)
+        self._embeddings = np.vstack([rows, embedding[None, :]])
+
+    def clear(self) -> None:
+        self._entries = []
+        self._embeddings = np.zeros((0, 0), dtype=np.float32)
+
+    def _evict(self, knowledge_version: Any) -> None:
+        """Drop entries that are past their TTL or were answered against an older knowledge base."""
+        now = time.monotonic()
+        keep = []
+        for i, entry in enumerate(self._entries):
+            if now - entry.created_at > self.ttl:
+                self.stats["expired"] += 1
+            elif entry.knowledge_version != knowledge_version:
+                self.stats["invalidated"] += 1
+            else:
+                keep.append(i)
+        if len(keep) != len(self._entries):
+            self._entries = [self._entries[i] for i in keep]
+            self._embeddings = self._embeddings[keep]
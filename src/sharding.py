@@ -0,0 +1,52 @@
+import zlib
+
+def shard_names(collection_name: str, num_shards: int) -> list[str]:
+    """Names of the Chroma collections backing a (possibly) sharded collection."""
+    if num_shards == 1:
+        return [collection_name]
+    return [f"{collection_name}_shard_{i}" for i in range(num_shards)]
+
+def shard_for(doc_id: str, metadata: dict | None, num_shards: int) -> int:
+    """
+    Pick the shard of a document. Transcript chunks are placed by episode so a
+    whole episode lives in one shard and can be rebuilt together, anything else
+    by its id. crc32 rather than hash() so placement is stable across processes.
+    """
+    key = (metadata or {}).get("episode_number") or doc_id
+    return zlib.crc32(str(key).encode()) % num_shards
+
+def group_by_shard(documents, metadatas, ids, num_shards: int, embeddings=None) -> dict[int, dict[str, list]]:
+    """Split parallel document lists into per-shard `collection.add` keyword arguments."""
+    groups: dict[int, dict[str, list]] = {}
+    for i, (document, metadata, doc_id) in enumerate(zip(documents, metadatas, ids)):
+        group = groups.setdefault(shard_for(doc_id, metadata, num_shards), {
+            "documents": [], "metadatas": [], "ids": [], **({"embeddings": []} if embeddings is not None else {})
+        })
+        group["documents"].append(document)
+        group["metadatas"].append(metadata)
+        group["ids"].append(doc_id)
+        if embeddings is not None:
+            group["embeddings"].append(embeddings[i])
+    return groups
+
+def gather_results(shard_results, n_results: int):
+    """
+    Merge per-shard `collection.query` results into the global top `n_results`
+    per query by distance. The return value has the same shape as a single
+    `collection.query` call.
+    """
+    keys = [key for key in ("ids", "documents", "metadatas", "distances", "embeddings")
+            if all(result.get(key) is not None for result in shard_results)]
+    num_queries = len(shard_results[0]["ids"]) if shard_results else 0
+    gathered = {key: [] for key in keys}
+    for query_index in range(num_queries):
+        hits = [
+            {key: result[key][query_index][rank] for key in keys}
+            for result in shard_results
+            for rank in range(len(result["ids"][query_index]))
+        ]
+        hits.sort(key=lambda hit: hit["distances"])
+        hits = hits[:n_results]
+        for key in keys:
+            gathered[key].append([hit[key] for hit in hits])
+    return gathered
@@ -0,0 +1,91 @@
+import json
+from typing import Any, Iterator
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SNAPSHOT_FORMAT_VERSION = "1"
+SNAPSHOT_BATCH_SIZE = 5000
+
+def _schema(dimension: int, embedding_model: str, index_params: dict[str, Any]) -> pa.Schema:
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("document", pa.string()),
+            ("metadata", pa.string()),  # JSON, metadata keys differ between documents
+            ("embedding", pa.list_(pa.float32(), dimension)),
+        ],
+        metadata={
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "embedding_model": embedding_model,
+            "dimension": str(dimension),
+            "index_params": json.dumps(index_params),
+        },
+    )
+
+def iter_collection(collection, batch_size: int = SNAPSHOT_BATCH_SIZE,
+                    include=("documents", "metadatas", "embeddings")) -> Iterator[dict[str, list]]:
+    """Page through a Chroma collection so it is never loaded in one `get`."""
+    for offset in range(0, collection.count(), batch_size):
+        batch = collection.get(include=list(include), limit=batch_size, offset=offset)
+        yield {key: batch[key] for key in ("ids", *include)}
+
+def write_snapshot(path: str, collections, embedding_model: str, batch_size: int = SNAPSHOT_BATCH_SIZE,
+                   index_params: dict[str, Any] | None = None) -> int:
+    """
+    Stream every document of `collections` into a Parquet file, one row group
+    per batch so the collection is never held in memory at once. The HNSW
+    `index_params` are recorded so the collection can be recreated with them.
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        ValueError: If the collections are empty, there is no embedding
+            dimension to record and nothing to import later
+    """
+    writer = None
+    rows = 0
+    try:
+        for collection in collections:
+            for batch in iter_collection(collection, batch_size):
+                embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+                if writer is None:
+                    schema = _schema(embeddings.shape[1], embedding_model, index_params or {})
+                    writer = pq.ParquetWriter(path, schema)
+                table = pa.Table.from_arrays(
+                    [
+                        pa.array(batch["ids"], pa.string()),
+                        pa.array(batch["documents"], pa.string()),
+                        pa.array([json.dumps(meta) for meta in batch["metadatas"]], pa.string()),
+                        pa.FixedSizeListArray.from_arrays(pa.array(embeddings.ravel()), embeddings.shape[1]),
+                    ],
+                    schema=schema,
+                )
+                writer.write_table(table)
+                rows += len(batch["ids"])
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError("Cannot export an empty collection, no snapshot was written")
+    return rows
+
+def snapshot_info(path: str) -> dict[str, Any]:
+    """The format version, embedding model, dimension and index settings a snapshot was written with."""
+    metadata = pq.read_schema(path).metadata or {}
+    info = {key.decode(): value.decode() for key, value in metadata.items()}
+    info["index_params"] = json.loads(info.get("index_params", "{}"))
+    return info
+
+def read_snapshot(path: str, batch_size: int = SNAPSHOT_BATCH_SIZE) -> Iterator[dict[str, Any]]:
+    """Yield `collection.add` keyword arguments for consecutive chunks of a snapshot."""
+    dimension = int(snapshot_info(path)["dimension"])
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        embeddings = batch.column("embedding").flatten().to_numpy().reshape(-1, dimension)
+        yield {
+            "ids": batch.column("id").to_pylist(),
+            "documents": batch.column("document").to_pylist(),
+            "metadatas": [json.loads(meta) for meta in batch.column("metadata").to_pylist()],
+            "embeddings": embeddings.tolist(),
+        }
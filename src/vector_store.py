@@ -1,13 +1,31 @@
 import os
 from dotenv import load_dotenv
 import chromadb
+from chromadb.db.base import UniqueConstraintError
 from chromadb.utils import embedding_functions
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import threading
 from uuid import uuid4
+from src.reranking import mmr_rerank
+from src.sharding import shard_names, group_by_shard, gather_results
+from src.snapshot import write_snapshot, read_snapshot, snapshot_info, iter_collection, SNAPSHOT_BATCH_SIZE
 load_dotenv()
 
 #TODO: Clean this up and put it somewhere else
 PATH = "./chroma_db"
 MODEL = "text-embedding-ada-002"
+# Set CHROMA_HOST to use a Chroma server instead of the local PATH. A
+# PersistentClient must not be written to by several processes at once.
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+NUM_SHARDS = int(os.getenv("VECTOR_STORE_SHARDS", "1"))
+REBUILD_BATCH_SIZE = 5000
+REBUILD_SUFFIX = "_rebuild"  # temporary collection a shard is rebuilt into
+# Documents per `collection.add` call. Larger writes are split so the chunks are
+# embedded concurrently and stay under the embedding API's per-request input limit.
+WRITE_BATCH_SIZE = 1000
+WRITE_WORKERS = 8
 
 def get_openai_key():
     key = os.getenv("OPENAI_API_KEY")
@@ -15,46 +33,435 @@ def get_openai_key():
         raise ValueError("OPENAI_API_KEY environment variable is not set")
     return key
 
+RRF_K = 60  # damping constant from the original reciprocal rank fusion paper
+FUSION_RULES = ("rrf", "min_distance")
+MMR_FETCH_MULTIPLIER = 4  # candidate pool size relative to n_results when re-ranking
+
+def merge_results(results, n_results=3, fusion="rrf"):
+    """
+    Merge a multi-query Chroma result into a single query's worth of hits.
+
+    Hits are deduplicated by id. With "rrf" they are ordered by reciprocal rank
+    fusion, which favours documents several queries agree on; with
+    "min_distance" by their best distance to any query. Each hit keeps its
+    smallest distance. The return value has the same shape as `collection.query`
+    for one query, embeddings included if they were requested.
+    """
+    if fusion not in FUSION_RULES:
+        raise ValueError(f"Unknown fusion rule: {fusion}. Expected one of {FUSION_RULES}")
+
+    embeddings = results.get("embeddings")
+    hits = {}
+    for query_index, ids in enumerate(results["ids"]):
+        for rank, doc_id in enumerate(ids):
+            distance = results["distances"][query_index][rank]
+            hit = hits.setdefault(doc_id, {
+                "document": results["documents"][query_index][rank],
+                "metadata": results["metadatas"][query_index][rank],
+                "embedding": embeddings[query_index][rank] if embeddings is not None else None,
+                "distance": distance,
+                "score": 0.0,
+            })
+            hit["distance"] = min(hit["distance"], distance)
+            hit["score"] += 1.0 / (RRF_K + rank + 1)
+
+    if fusion == "rrf":
+        ranked = sorted(hits.items(), key=lambda item: -item[1]["score"])
+    else:
+        ranked = sorted(hits.items(), key=lambda item: item[1]["distance"])
+    ranked = ranked[:n_results]
+
+    merged = {
+        "ids": [[doc_id for doc_id, _ in ranked]],
+        "documents": [[hit["document"] for _, hit in ranked]],
+        "metadatas": [[hit["metadata"] for _, hit in ranked]],
+        "distances": [[hit["distance"] for _, hit in ranked]],
+    }
+    if embeddings is not None:
+        merged["embeddings"] = [[hit["embedding"] for _, hit in ranked]]
+    return merged
+
+# HNSW settings Chroma reads from collection metadata. They only take effect
+# when a collection is created, rebuild a shard to apply new ones.
+INDEX_PARAMS = ("space", "M", "construction_ef", "search_ef", "num_threads", "resize_factor", "batch_size", "sync_threshold")
+SPACES = ("cosine", "l2", "ip")
+
+def index_metadata(index_params=None):
+    """Translate e.g. {"M": 32, "search_ef": 50} into Chroma's "hnsw:" collection metadata."""
+    index_params = index_params or {}
+    unknown = set(index_params) - set(INDEX_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown index parameters: {sorted(unknown)}. Expected some of {INDEX_PARAMS}")
+    if index_params.get("space", "l2") not in SPACES:
+        raise ValueError(f"Unknown space: {index_params['space']}. Expected one of {SPACES}")
+    return {f"hnsw:{key}": value for key, value in index_params.items()}
+
+def index_params_from_metadata(metadata):
+    """Inverse of `index_metadata`. Chroma's defaults for settings that weren't given are not listed."""
+    return {key[len("hnsw:"):]: value for key, value in (metadata or {}).items() if key.startswith("hnsw:")}
+
 class VectorStore:
-    def __init__(self):
-        self.client = chromadb.PersistentClient(path=PATH)        
+    def __init__(self, num_shards=NUM_SHARDS, index_params=None, migrate_unsharded=False):
+        """
+        Args:
+            num_shards: Number of Chroma collections each collection is spread over
+            index_params: HNSW settings for the default collection, see INDEX_PARAMS
+            migrate_unsharded: Move documents of an existing unsharded default
+                collection into the shards. Without it, finding such data when
+                `num_shards` > 1 is an error rather than silently ignoring it
+        """
+        if CHROMA_HOST:
+            self.client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+        else:
+            self.client = chromadb.PersistentClient(path=PATH)
         self.openai_ef = embedding_functions.OpenAIEmbeddingFunction(
             api_key=get_openai_key(),
             model_name=MODEL
         )
+        # Each collection is spread over `num_shards` Chroma collections. Writes
+        # and queries fan out to the shards on this pool and results are merged.
+        self.num_shards = num_shards
+        self._executor = ThreadPoolExecutor(max_workers=max(num_shards, WRITE_WORKERS))
+        # Held while a shard is written to or rebuilt, see rebuild_shard
+        self._shard_locks = defaultdict(threading.Lock)
+        self._shard_locks_guard = threading.Lock()
+        self._resume_rebuilds("default_collection")
+        self._check_layout("default_collection", migrate_unsharded)
         
         # Initialize default collection
-        self.default_collection = self.client.get_or_create_collection(
-            name="default_collection",
-            embedding_function=self.openai_ef,
-            metadata={"description": "Default collection using OpenAI embeddings"}
+        self.default_shards = self.create_collection(
+            "default_collection", "Default collection using OpenAI embeddings", index_params
         )
+        if migrate_unsharded:
+            self.migrate_unsharded("default_collection")
+
+    @property
+    def default_collection(self):
+        if self.num_shards > 1:
+            raise AttributeError("default_collection is sharded, use default_shards or the VectorStore methods")
+        return self.default_shards[0]
+
+    def _check_layout(self, collection_name, migrate_unsharded=False):
+        """
+        Refuse to open a collection whose documents live under a different
+        shard layout than `num_shards`, searches would silently miss them.
+        """
+        expected = set(shard_names(collection_name, self.num_shards))
+        existing = {collection.name: collection for collection in self.client.list_collections()}
+        stray = [
+            name for name, collection in existing.items()
+            if name not in expected
+            and self._belongs_to(name, collection_name)
+            # A rebuild copy whose shard still exists is only left over from a failed copy
+            and not (name.endswith(REBUILD_SUFFIX) and name.removesuffix(REBUILD_SUFFIX) in existing)
+            and collection.count() > 0
+        ]
+        if migrate_unsharded:
+            stray = [name for name in stray if name != collection_name]
+        if stray:
+            raise ValueError(
+                f"{collection_name} has documents in {sorted(stray)}, which don't match num_shards={self.num_shards}. "
+                f"Use the original number of shards, or pass migrate_unsharded=True to move unsharded data."
+            )
+
+    @staticmethod
+    def _belongs_to(name, collection_name):
+        """Whether `name` is one of the Chroma collections of `collection_name` under any shard layout."""
+        name = name.removesuffix(REBUILD_SUFFIX)
+        return name == collection_name or name.startswith(f"{collection_name}_shard_")
 
-    def add_documents(self, documents, metadatas=None, ids=None, collection_name="default_collection"):
-        """Add documents to the specified collection"""
-        collection = self.client.get_collection(name=collection_name)
+    def _resume_rebuilds(self, collection_name):
+        """
+        Finish rebuilds that stopped between deleting a shard and renaming its
+        rebuilt copy, otherwise the copy would be the only one holding the
+        shard's documents and the shard would be recreated empty. The copy is
+        complete by then, it replaces the shard. Copies whose shard still
+        exists are from a failed copy and are removed by the next rebuild.
+        """
+        existing = {collection.name for collection in self.client.list_collections()}
+        for name in shard_names(collection_name, self.num_shards):
+            if name not in existing and f"{name}{REBUILD_SUFFIX}" in existing:
+                print(f"Finishing the interrupted rebuild of {name}")
+                rebuilt = self.client.get_collection(name=f"{name}{REBUILD_SUFFIX}", embedding_function=self.openai_ef)
+                rebuilt.modify(name=name)
+
+    def migrate_unsharded(self, collection_name="default_collection"):
+        """
+        Copy the documents of an unsharded collection into its shards, reusing
+        the stored embeddings, then delete the unsharded collection.
+
+        Returns:
+            Number of documents moved
+        """
+        if self.num_shards == 1:
+            return 0
+        try:
+            source = self.client.get_collection(name=collection_name, embedding_function=self.openai_ef)
+        except ValueError:
+            return 0
+        moved = 0
+        for batch in iter_collection(source, REBUILD_BATCH_SIZE):
+            self.add_documents(collection_name=collection_name, **batch)
+            moved += len(batch["ids"])
+        self.client.delete_collection(name=collection_name)
+        return moved
+
+    def create_collection(self, collection_name, description="", index_params=None):
+        """
+        Create a (possibly sharded) collection, or get it if it already exists.
+
+        Args:
+            collection_name: Name of the collection
+            description: Stored in the collection metadata
+            index_params: HNSW settings, any of INDEX_PARAMS. Ignored for
+                collections that already exist
+
+        Returns:
+            The Chroma collections backing the shards
+        """
+        return [
+            self._get_or_create_collection(name, description, index_params)
+            for name in shard_names(collection_name, self.num_shards)
+        ]
+
+    def _get_or_create_collection(self, name, description, index_params=None):
+        # Metadata is only passed on creation, get_or_create_collection would replace
+        # an existing collection's metadata and lose its recorded HNSW settings
+        try:
+            return self.client.get_collection(name=name, embedding_function=self.openai_ef)
+        except ValueError:
+            pass
+        try:
+            return self.client.create_collection(
+                name=name,
+                embedding_function=self.openai_ef,
+                metadata={"description": description, **index_metadata(index_params)}
+            )
+        except UniqueConstraintError:
+            # Created by another process in the meantime
+            return self.client.get_collection(name=name, embedding_function=self.openai_ef)
+
+    def index_params(self, collection_name="default_collection"):
+        """The HNSW settings a collection was created with."""
+        return index_params_from_metadata(self._shards(collection_name)[0].metadata)
+
+    def _shards(self, collection_name):
+        return [self.client.get_collection(name=name, embedding_function=self.openai_ef)
+                for name in shard_names(collection_name, self.num_shards)]
+
+    def _map_shards(self, fn, items, concurrent=True):
+        """Run `fn` over the items on the thread pool, inline when there is only one or not `concurrent`."""
+        items = list(items)
+        if len(items) == 1 or not concurrent:
+            return [fn(item) for item in items]
+        return list(self._executor.map(fn, items))
+
+    def add_documents(self, documents, metadatas=None, ids=None, collection_name="default_collection", embeddings=None,
+                      concurrent=True):
+        """
+        Add documents to the specified collection, embedding them unless `embeddings` are given.
+        Pass `concurrent=False` to write from the calling thread, e.g. at interpreter exit
+        when the thread pool no longer accepts work.
+        """
+        names = shard_names(collection_name, self.num_shards)
         
         if metadatas is None:
             metadatas = [{"source": "unknown"} for _ in documents]
         if ids is None:
             ids = [f"{uuid4()}" for i in range(len(documents))]
         
-            
-        collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        groups = group_by_shard(documents, metadatas, ids, len(names), embeddings=embeddings)
+        writes = [
+            (names[shard_index], {key: values[start:start + WRITE_BATCH_SIZE] for key, values in group.items()})
+            for shard_index, group in groups.items()
+            for start in range(0, len(group["ids"]), WRITE_BATCH_SIZE)
+        ]
+        self._map_shards(lambda write: self._write(*write), writes, concurrent)
 
-    def search_similar(self, query_text, n_results=3, collection_name="default_collection"):
-        """Search for similar documents in the specified collection"""
-        collection = self.client.get_collection(name=collection_name)
-        results = collection.query(
-            query_texts=[query_text],
-            n_results=n_results
+    def _shard_lock(self, name):
+        with self._shard_locks_guard:
+            return self._shard_locks[name]
+
+    def _write(self, name, batch):
+        # The collection is looked up under the lock, a rebuild replaces it
+        with self._shard_lock(name):
+            self.client.get_collection(name=name, embedding_function=self.openai_ef).add(**batch)
+
+    def _query(self, shards, query_embeddings, n_results, include):
+        """Query every shard concurrently and merge into the global top `n_results`."""
+        shard_results = self._map_shards(
+            lambda shard: shard.query(query_embeddings=query_embeddings, n_results=n_results, include=include),
+            shards
         )
+        if len(shard_results) == 1:
+            return shard_results[0]
+        return gather_results(shard_results, n_results)
+
+    def search_similar(self, query_text, n_results=3, collection_name="default_collection", fusion="rrf",
+                       mmr_lambda=None, fetch_k=None):
+        """
+        Search for similar documents in the specified collection.
+
+        `query_text` may be a single query or a list of rephrasings. A list is
+        embedded in one batched request, run as one multi-query call, and the
+        hits are merged into a single deduplicated result list (see `merge_results`).
+
+        When `mmr_lambda` is set, a larger pool of `fetch_k` candidates is fetched
+        and re-ranked with Maximal Marginal Relevance so overlapping transcript
+        windows don't crowd out other results (see `reranking.mmr_rerank`).
+
+        Sharded collections are queried concurrently and the hits merged into
+        a global top-k before fusion and re-ranking.
+        """
+        shards = self._shards(collection_name)
+        use_mmr = mmr_lambda is not None
+        if isinstance(query_text, str) and not use_mmr and len(shards) == 1:
+            return shards[0].query(
+                query_texts=[query_text],
+                n_results=n_results
+            )
+
+        queries = [query_text] if isinstance(query_text, str) else list(query_text)
+        query_embeddings = self.openai_ef(queries)
+        pool_size = (fetch_k or MMR_FETCH_MULTIPLIER * n_results) if use_mmr else n_results
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if use_mmr else [])
+        results = self._query(shards, query_embeddings, pool_size, include)
+        if len(queries) > 1:
+            results = merge_results(results, n_results=pool_size, fusion=fusion)
+        if use_mmr:
+            results = mmr_rerank(results, query_embeddings, n_results=n_results, lambda_mult=mmr_lambda)
         return results
 
+    def rebuild_shard(self, shard_index, collection_name="default_collection", index_params=None):
+        """
+        Rebuild the index of a single shard from its stored documents and
+        embeddings, without re-embedding and without touching the other shards.
+        `index_params` replace the shard's HNSW settings, by default they are kept.
+
+        The new index is built page by page into a temporary collection that only
+        replaces the shard once it is complete, so a failure leaves the shard intact,
+        and an interruption between the two steps is finished by the next VectorStore.
+
+        Writes to the shard through this VectorStore wait until the rebuild is
+        done. Other processes can't be blocked: rebuild while they aren't
+        writing, their documents would be missing from the rebuilt shard.
+        """
+        name = shard_names(collection_name, self.num_shards)[shard_index]
+        with self._shard_lock(name):
+            rows = self._rebuild(name, index_params)
+        if collection_name == "default_collection":
+            # The rebuilt shard is a new Chroma collection
+            self.default_shards = self._shards(collection_name)
+        return rows
+
+    def _rebuild(self, name, index_params):
+        shard = self.client.get_collection(name=name, embedding_function=self.openai_ef)
+        description = (shard.metadata or {}).get("description", "")
+        if index_params is None:
+            index_params = index_params_from_metadata(shard.metadata)
+
+        tmp_name = f"{name}{REBUILD_SUFFIX}"
+        try:
+            self.client.delete_collection(name=tmp_name)  # left over from a failed rebuild
+        except ValueError:
+            pass
+        rebuilt = self._get_or_create_collection(tmp_name, description, index_params)
+        rows = 0
+        try:
+            for batch in iter_collection(shard, REBUILD_BATCH_SIZE):
+                rebuilt.add(**batch)
+                rows += len(batch["ids"])
+        except Exception:
+            self.client.delete_collection(name=tmp_name)
+            raise
+
+        self.client.delete_collection(name=name)
+        rebuilt.modify(name=name)
+        return rows
+
+    def export_snapshot(self, path, collection_name="default_collection", batch_size=SNAPSHOT_BATCH_SIZE):
+        """
+        Export the ids, documents, metadata and embeddings of a collection to a
+        Parquet snapshot that `import_snapshot` can load without re-embedding.
+
+        Returns:
+            Number of documents exported
+
+        Raises:
+            ValueError: If the collection is empty
+        """
+        shards = self._shards(collection_name)
+        return write_snapshot(path, shards, embedding_model=MODEL, batch_size=batch_size,
+                              index_params=index_params_from_metadata(shards[0].metadata))
+
+    def import_snapshot(self, path, collection_name="default_collection", batch_size=SNAPSHOT_BATCH_SIZE):
+        """
+        Bulk load a snapshot written by `export_snapshot` in chunks, reusing its
+        embeddings. The collection gets the HNSW settings of the exported one: a
+        new or empty collection is (re)created with them.
+
+        Returns:
+            Number of documents imported
+
+        Raises:
+            ValueError: If the snapshot was made with a different embedding model,
+                dimensionality or, for a collection with documents, index settings
+                than this store uses
+        """
+        info = snapshot_info(path)
+        if info.get("embedding_model") != MODEL:
+            raise ValueError(
+                f"Snapshot was embedded with {info.get('embedding_model')}, but this store uses {MODEL}"
+            )
+        dimension = self._dimension(collection_name)
+        if dimension is not None and dimension != int(info["dimension"]):
+            raise ValueError(
+                f"Snapshot embeddings have dimension {info['dimension']}, but {collection_name} has {dimension}"
+            )
+
+        try:
+            shards = self._shards(collection_name)
+        except ValueError:
+            shards = []
+        if shards and self.index_params(collection_name) != info["index_params"]:
+            if any(shard.count() for shard in shards):
+                raise ValueError(
+                    f"{collection_name} uses index settings {self.index_params(collection_name)}, but the snapshot "
+                    f"{info['index_params']}. Import into a new collection or rebuild the shards with them first"
+                )
+            # HNSW settings only take effect on creation, e.g. the empty default collection
+            for shard in shards:
+                self.client.delete_collection(name=shard.name)
+
+        self.create_collection(collection_name, f"Imported from snapshot {os.path.basename(path)}",
+                               index_params=info["index_params"])
+        if collection_name == "default_collection":
+            self.default_shards = self._shards(collection_name)
+        rows = 0
+        for batch in read_snapshot(path, batch_size=batch_size):
+            self.add_documents(collection_name=collection_name, **batch)
+            rows += len(batch["ids"])
+        return rows
+
+    def _dimension(self, collection_name):
+        """Embedding dimension of a collection, None if it doesn't exist or is empty."""
+        try:
+            shards = self._shards(collection_name)
+        except ValueError:
+            return None
+        for shard in shards:
+            sample = shard.peek(limit=1)
+            if sample["embeddings"]:
+                return len(sample["embeddings"][0])
+        return None
+
+    def version(self, collection_name="default_collection"):
+        """
+        A cheap marker that changes whenever documents are added to a collection,
+        including by other processes. Used to invalidate cached answers.
+        """
+        return sum(shard.count() for shard in self._shards(collection_name))
+
     def list_collections(self):
         """List all available collections"""
         return self.client.list_collections() 
\ No newline at end of file
@@ -6,6 +6,7 @@ from src.actions.add_knowledge import Knowledge
 from src.actions.retrieve_knowledge import Search
 import re
 from src.scripts.add_knowledge import *
+from src.scripts.transcripts_utils import get_files
 
 
 TEST_QUERY_1 = """
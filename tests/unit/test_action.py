@@ -0,0 +1,38 @@
+from dataclasses import dataclass, field
+import pytest
+from src.actions.action import Action
+
+
+@dataclass
+class Recorder(Action):
+    name: str = "recorder"
+    is_self_referential: bool = False
+    config: dict = field(default_factory=lambda: {
+        "type": "function",
+        "function": {"name": "recorder", "parameters": {"type": "object", "required": ["message"]}},
+    })
+
+    def execute_function(self, **kwargs):
+        return kwargs
+
+
+def test_regular_actions_get_their_arguments_only():
+    assert Recorder()('{"message": "hi"}', depth=2) == {"message": "hi"}
+
+
+def test_self_referential_actions_continue_from_callers_depth():
+    action = Recorder(is_self_referential=True)
+    assert action({"message": "hi"}, depth=2, max_depth=5) == {"message": "hi", "current_depth": 3, "max_depth": 5}
+    # The model can lower max_depth but not raise it
+    assert action({"message": "hi", "max_depth": 50}, depth=0, max_depth=5)["max_depth"] == 5
+    assert action({"message": "hi", "max_depth": 2}, depth=0, max_depth=5)["max_depth"] == 2
+
+
+def test_max_depth_is_enforced():
+    with pytest.raises(RecursionError):
+        Recorder(is_self_referential=True)({"message": "hi"}, depth=5, max_depth=5)
+
+
+def test_missing_required_parameter():
+    with pytest.raises(RuntimeError):
+        Recorder()({}, depth=0)
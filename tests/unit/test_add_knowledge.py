@@ -0,0 +1,145 @@
+import pytest
+from types import SimpleNamespace
+from src.actions import add_knowledge
+from src.actions.add_knowledge import Knowledge
+from src.agent import Agent
+
+
+class FakeVectorStore:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.writes = []
+
+    def add_documents(self, documents, metadatas, ids, concurrent=True):
+        if self.fail:
+            raise ConnectionError("store unavailable")
+        self.writes.append({"documents": documents, "metadatas": metadatas, "ids": ids, "concurrent": concurrent})
+
+
+@pytest.fixture
+def registered(monkeypatch):
+    handlers = []
+    monkeypatch.setattr(add_knowledge.atexit, "register", handlers.append)
+    return handlers
+
+
+def make_knowledge(store, **kwargs):
+    knowledge = Knowledge(**kwargs)
+    knowledge.add_context(SimpleNamespace(vector_store=store))
+    return knowledge
+
+
+def test_documents_are_queued_until_the_batch_is_full(registered):
+    store = FakeVectorStore()
+    knowledge = make_knowledge(store, max_batch_size=3)
+
+    assert knowledge.execute_function(content="one").startswith("Queued 1")
+    assert knowledge.execute_function(content="two").startswith("Queued 1")
+    assert store.writes == []
+    assert knowledge.execute_function(content="three").startswith("Added 1")
+
+    assert len(store.writes) == 1
+    assert store.writes[0]["documents"] == ["one", "two", "three"]
+
+
+def test_old_documents_are_flushed(registered, monkeypatch):
+    store = FakeVectorStore()
+    knowledge = make_knowledge(store, max_batch_size=100, max_batch_age=30.0)
+    now = 1000.0
+    monkeypatch.setattr(add_knowledge.time, "monotonic", lambda: now)
+    knowledge.execute_function(content="one")
+
+    now += 31
+    assert knowledge.execute_function(content="two").startswith("Added")
+    assert store.writes[0]["documents"] == ["one", "two"]
+
+
+def test_items_are_queued_with_local_ids(registered):
+    store = FakeVectorStore()
+    knowledge = make_knowledge(store)
+
+    result = knowledge.execute_function(
+        content="third",
+        items=[{"content": "first", "metadata": {"source": "paper"}}, {"content": "second"}],
+    )
+    assert knowledge.flush() == 3
+
+    write = store.writes[0]
+    assert write["documents"] == ["first", "second", "third"]
+    assert write["metadatas"][0] == {"source": "paper"}
+    assert write["metadatas"][1] == add_knowledge.DEFAULT_METADATA
+    assert len(set(write["ids"])) == 3
+    assert all(doc_id.startswith("doc_") and doc_id in result for doc_id in write["ids"])
+
+
+def test_missing_content_is_an_error(registered):
+    with pytest.raises(ValueError):
+        make_knowledge(FakeVectorStore()).execute_function()
+
+
+def test_failed_flush_keeps_the_queue(registered):
+    store = FakeVectorStore(fail=True)
+    knowledge = make_knowledge(store)
+    knowledge.execute_function(content="one")
+
+    with pytest.raises(ConnectionError):
+        knowledge.flush()
+    store.fail = False
+    assert knowledge.flush() == 1
+    assert store.writes[0]["documents"] == ["one"]
+
+
+def test_exit_flush_is_registered_once_and_writes_inline(registered):
+    store = FakeVectorStore()
+    knowledge = make_knowledge(store)
+    knowledge.add_context(SimpleNamespace(vector_store=store))
+    assert len(registered) == 1
+
+    knowledge.execute_function(content="one")
+    registered[0]()
+    assert store.writes[0]["concurrent"] is False
+
+
+def test_exit_flush_errors_are_logged(registered, capsys):
+    knowledge = make_knowledge(FakeVectorStore(fail=True))
+    knowledge.execute_function(content="one")
+    registered[0]()
+    assert "store unavailable" in capsys.readouterr().out
+
+
+def make_agent(actions, run_task):
+    # Skip __init__, it needs an OpenAI key and the local Chroma store
+    agent = Agent.__new__(Agent)
+    agent.action_map = {action.name: action for action in actions}
+    agent.semantic_cache = None
+    agent._run_task = run_task
+    return agent
+
+
+def test_task_end_flushes_the_queue(registered):
+    store = FakeVectorStore()
+    knowledge = make_knowledge(store)
+    agent = make_agent([knowledge], lambda *args: knowledge.execute_function(content="one") and {"response": "ok"})
+
+    assert agent.execute_task("hi") == {"response": "ok"}
+    assert store.writes[0]["documents"] == ["one"]
+
+
+def test_failed_flush_keeps_the_answer_and_the_queue(registered):
+    store = FakeVectorStore(fail=True)
+    knowledge = make_knowledge(store)
+    agent = make_agent([knowledge], lambda *args: knowledge.execute_function(content="one") and {"response": "ok"})
+
+    assert agent.execute_task("hi") == {"response": "ok"}
+    assert knowledge._pending_documents == ["one"]
+
+
+def test_failed_flush_doesnt_hide_the_task_error(registered):
+    knowledge = make_knowledge(FakeVectorStore(fail=True))
+    knowledge.execute_function(content="one")
+
+    def run_task(*args):
+        raise TimeoutError("model timed out")
+
+    with pytest.raises(TimeoutError):
+        make_agent([knowledge], run_task).execute_task("hi")
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from src import jobs
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # SQLite ignores FOR UPDATE SKIP LOCKED, which is fine for a single process
+    return jobs.get_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def set_job(engine, job_id, **values):
+    with Session(engine) as session, session.begin():
+        session.execute(update(jobs.Job).where(jobs.Job.id == job_id).values(**values))
+
+
+def test_retry_delay_doubles_per_attempt():
+    assert [jobs.retry_delay(attempts) for attempts in (1, 2, 3)] == [
+        jobs.RETRY_BACKOFF, 2 * jobs.RETRY_BACKOFF, 4 * jobs.RETRY_BACKOFF
+    ]
+
+
+def test_claim_marks_job_running(engine):
+    job_id = jobs.enqueue(engine, "hello", model="gpt-4o-mini")
+
+    job = jobs.claim(engine, "worker-1")
+
+    assert job.id == job_id
+    assert (job.status, job.attempts, job.worker_id) == (jobs.RUNNING, 1, "worker-1")
+    assert job.parameters == {"model": "gpt-4o-mini"}
+    assert jobs.claim(engine, "worker-2") is None
+
+
+def test_complete_stores_result(engine):
+    job_id = jobs.enqueue(engine, "hello")
+    jobs.claim(engine, "worker-1")
+
+    jobs.complete(engine, job_id, "worker-1", {
+        "response": "hi", "tool_calls": [{"result": object()}], "usage": {"total_tokens": 7}
+    }, duration=1.5)
+
+    job = jobs.get_job(engine, job_id)
+    assert (job.status, job.response, job.usage, job.duration_seconds) == (jobs.SUCCEEDED, "hi", {"total_tokens": 7}, 1.5)
+    assert isinstance(job.tool_calls[0]["result"], str)
+
+
+def test_fail_schedules_retry_then_gives_up(engine):
+    job_id = jobs.enqueue(engine, "hello", max_attempts=2)
+    jobs.claim(engine, "worker-1")
+
+    jobs.fail(engine, job_id, "worker-1", "boom", duration=0.1)
+    job = jobs.get_job(engine, job_id)
+    assert (job.status, job.error) == (jobs.PENDING, "boom")
+    assert jobs.claim(engine, "worker-1") is None  # still backing off
+
+    set_job(engine, job_id, available_at=utc_now() - timedelta(seconds=1))
+    assert jobs.claim(engine, "worker-1").attempts == 2
+    jobs.fail(engine, job_id, "worker-1", "boom again", duration=0.1)
+    assert jobs.get_job(engine, job_id).status == jobs.FAILED
+
+    assert jobs.retry(engine, job_id)
+    job = jobs.get_job(engine, job_id)
+    assert (job.status, job.attempts) == (jobs.PENDING, 0)
+    assert not jobs.retry(engine, job_id)
+
+
+def test_fail_from_other_worker_is_ignored(engine):
+    job_id = jobs.enqueue(engine, "hello")
+    jobs.claim(engine, "worker-1")
+
+    jobs.fail(engine, job_id, "worker-2", "boom", duration=0.1)
+
+    assert jobs.get_job(engine, job_id).status == jobs.RUNNING
+
+
+def test_stale_job_is_reclaimed_until_attempts_run_out(engine):
+    job_id = jobs.enqueue(engine, "crashes its worker", max_attempts=2)
+    stale = utc_now() - timedelta(seconds=jobs.HEARTBEAT_TIMEOUT + 1)
+
+    jobs.claim(engine, "worker-1")
+    set_job(engine, job_id, heartbeat_at=stale)
+    job = jobs.claim(engine, "worker-2")
+    assert (job.worker_id, job.attempts) == ("worker-2", 2)
+
+    set_job(engine, job_id, heartbeat_at=stale)
+    assert jobs.claim(engine, "worker-3") is None
+    job = jobs.get_job(engine, job_id)
+    assert (job.status, job.error) == (jobs.FAILED, "worker lost heartbeat")
+    assert jobs.count_by_status(engine)[jobs.FAILED] == 1
+
+
+def test_worker_clock_skew_doesnt_reclaim_healthy_jobs(engine, monkeypatch):
+    class FastClock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(hours=1)
+
+    job_id = jobs.enqueue(engine, "hello")
+    jobs.claim(engine, "worker-1")
+    jobs.heartbeat(engine, job_id, "worker-1")
+
+    # A worker whose clock runs an hour ahead still uses the database's clock
+    monkeypatch.setattr(jobs, "datetime", FastClock)
+    assert jobs.claim(engine, "worker-2") is None
+    assert jobs.get_job(engine, job_id).worker_id == "worker-1"
+
+
+class FakeAgent:
+    def __init__(self, result):
+        self.result = result
+
+    def execute_task(self, message, **parameters):
+        return self.result
+
+
+@pytest.mark.parametrize("result, status", [
+    ({"response": "hi", "tool_calls": None, "usage": {"total_tokens": 3}}, jobs.SUCCEEDED),
+    ({"response": "Error: Maximum recursion depth exceeded", "tool_calls": None, "error": "max_depth_exceeded"}, jobs.FAILED),
+])
+def test_worker_fails_results_with_an_error(engine, result, status):
+    job_id = jobs.enqueue(engine, "hello", max_attempts=1)
+
+    jobs.run_worker(lambda: FakeAgent(result), url=str(engine.url), worker_id="worker-1", stop_when_empty=True)
+
+    job = jobs.get_job(engine, job_id)
+    assert job.status == status
+    assert job.error == result.get("error")
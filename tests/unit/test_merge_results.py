@@ -0,0 +1,49 @@
+import pytest
+from src.vector_store import merge_results
+
+
+def make_results(ids, distances):
+    """A multi-query Chroma result with one inner list per query."""
+    return {
+        "ids": ids,
+        "documents": [[f"doc {doc_id}" for doc_id in row] for row in ids],
+        "metadatas": [[{"id": doc_id} for doc_id in row] for row in ids],
+        "distances": distances,
+    }
+
+
+RESULTS = make_results(
+    ids=[["a", "b", "c"], ["b", "d", "a"]],
+    distances=[[0.10, 0.30, 0.35], [0.20, 0.25, 0.40]],
+)
+
+
+def test_merge_deduplicates_and_keeps_smallest_distance():
+    merged = merge_results(RESULTS, n_results=10, fusion="min_distance")
+
+    assert sorted(merged["ids"][0]) == ["a", "b", "c", "d"]
+    distances = dict(zip(merged["ids"][0], merged["distances"][0]))
+    assert distances == {"a": 0.10, "b": 0.20, "c": 0.35, "d": 0.25}
+    assert merged["documents"][0] == [f"doc {doc_id}" for doc_id in merged["ids"][0]]
+
+
+def test_min_distance_orders_by_best_distance():
+    merged = merge_results(RESULTS, n_results=3, fusion="min_distance")
+    assert merged["ids"] == [["a", "b", "d"]]
+
+
+def test_rrf_favours_documents_several_queries_agree_on():
+    merged = merge_results(RESULTS, n_results=3, fusion="rrf")
+    # b is ranked 2nd and 1st, a 1st and 3rd, d and c only appear once
+    assert merged["ids"] == [["b", "a", "d"]]
+
+
+def test_merge_carries_embeddings_when_present():
+    results = {**RESULTS, "embeddings": [[[1.0], [2.0], [3.0]], [[2.0], [4.0], [1.0]]]}
+    merged = merge_results(results, n_results=4, fusion="min_distance")
+    assert merged["embeddings"] == [[[1.0], [2.0], [4.0], [3.0]]]
+
+
+def test_unknown_fusion_rule():
+    with pytest.raises(ValueError):
+        merge_results(RESULTS, fusion="borda")
@@ -0,0 +1,54 @@
+import numpy as np
+from src.reranking import adjacency_matrix, mmr_rerank, mmr_select
+
+
+def chunk(episode, number):
+    return {"episode_number": episode, "episode_chunk_number": str(number)}
+
+
+def test_adjacency_marks_overlapping_windows_only():
+    metadatas = [chunk("1", 1), chunk("1", 3), chunk("1", 4), chunk("2", 2), {"source": "user_input"}]
+    adjacent = adjacency_matrix(metadatas, window=3)
+
+    assert adjacent[0, 1] and adjacent[1, 2] and adjacent[1, 0]
+    assert not adjacent[0, 2]  # three chunks apart, no shared paragraph
+    assert not adjacent[0, 3]  # other episode
+    assert not adjacent[:, 4].any() and not adjacent[4].any()
+    assert not adjacent.diagonal().any()
+
+
+def test_mmr_without_diversity_is_relevance_order():
+    candidates = np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]])
+    assert mmr_select([1.0, 0.0], candidates, k=3, lambda_mult=1.0) == [0, 1, 2]
+
+
+def test_mmr_prefers_dissimilar_candidates():
+    candidates = np.array([[1.0, 0.0], [0.99, 0.01], [0.7, 0.7]])
+    assert mmr_select([1.0, 0.0], candidates, k=2, lambda_mult=0.3) == [0, 2]
+
+
+def test_mmr_suppresses_adjacent_windows_until_pool_runs_out():
+    # All candidates equally relevant and orthogonal, so only adjacency matters
+    candidates = np.eye(4)
+    query = np.ones(4)
+    metadatas = [chunk("1", 1), chunk("1", 2), chunk("1", 3), chunk("1", 10)]
+    adjacent = adjacency_matrix(metadatas)
+
+    assert mmr_select(query, candidates, k=2, adjacent=adjacent) == [0, 3]
+    assert sorted(mmr_select(query, candidates, k=4, adjacent=adjacent)) == [0, 1, 2, 3]
+
+
+def test_mmr_rerank_keeps_result_shape():
+    metadatas = [chunk("1", 1), chunk("1", 2), chunk("1", 7)]
+    results = {
+        "ids": [["a", "b", "c"]],
+        "documents": [["A", "B", "C"]],
+        "metadatas": [metadatas],
+        "distances": [[0.1, 0.2, 0.3]],
+        "embeddings": [[[1.0, 0.0], [0.9, 0.1], [0.8, 0.2]]],
+    }
+    reranked = mmr_rerank(results, [[1.0, 0.0]], n_results=2)
+
+    assert reranked["ids"] == [["a", "c"]]
+    assert reranked["distances"] == [[0.1, 0.3]]
+    assert "embeddings" not in reranked
@@ -0,0 +1,141 @@
+from types import SimpleNamespace
+import pytest
+from src.routing import FINAL_ANSWER, TOOL_SELECTION, ModelRouter, cost, is_low_confidence
+
+TOOLS = [{"type": "function", "function": {"name": "search_knowledge"}}]
+
+
+def completion(content="", tool=None, arguments="{}", finish_reason="stop", prompt_tokens=100, completion_tokens=10):
+    tool_calls = [SimpleNamespace(function=SimpleNamespace(name=tool, arguments=arguments))] if tool else None
+    return SimpleNamespace(
+        choices=[SimpleNamespace(finish_reason=finish_reason,
+                                 message=SimpleNamespace(content=content, tool_calls=tool_calls))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens),
+    )
+
+
+class StubClient:
+    """Answers chat completions from a model -> completion (or exception) table."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.models = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model, **kwargs):
+        self.models.append(model)
+        response = self.responses[model]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.mark.parametrize("response, expected", [
+    (completion("An answer"), False),
+    (completion(tool="search_knowledge", arguments='{"query": "insects"}'), False),
+    (completion("   "), True),
+    (completion("Cut off", finish_reason="length"), True),
+    (completion(tool="search_web"), True),
+    (completion(tool="search_knowledge", arguments='{"query": '), True),
+])
+def test_is_low_confidence(response, expected):
+    assert is_low_confidence(response, {"search_knowledge"}) is expected
+
+
+def test_fast_model_is_used_when_confident():
+    client = StubClient({"gpt-4o-mini": completion(tool="search_knowledge"), "o3-mini": completion("unused")})
+    router = ModelRouter(client)
+
+    router.complete(TOOL_SELECTION, messages=[], tools=TOOLS)
+
+    assert client.models == ["gpt-4o-mini"]
+    assert router.last_model == "gpt-4o-mini"
+
+
+def test_escalates_on_low_confidence_and_errors():
+    client = StubClient({"gpt-4o-mini": completion(tool="no_such_tool"), "o3-mini": completion("ok")})
+    router = ModelRouter(client)
+    assert router.complete(TOOL_SELECTION, messages=[], tools=TOOLS).choices[0].message.content == "ok"
+
+    client.responses["gpt-4o-mini"] = RuntimeError("rate limited")
+    router.complete(TOOL_SELECTION, messages=[], tools=TOOLS)
+
+    assert client.models == ["gpt-4o-mini", "o3-mini", "gpt-4o-mini", "o3-mini"]
+    report = router.report()[TOOL_SELECTION]
+    assert (report["requests"], report["escalations"], report["calls"]) == (2, 2, 3)
+    assert report["models"]["gpt-4o-mini"]["failures"] == 1
+
+
+def test_last_model_error_is_raised():
+    router = ModelRouter(StubClient({"o3-mini": RuntimeError("down")}))
+    with pytest.raises(RuntimeError):
+        router.complete(FINAL_ANSWER, messages=[])
+
+
+def test_pinned_model_skips_policy():
+    client = StubClient({"gpt-4o": completion("")})
+    ModelRouter(client).complete(TOOL_SELECTION, model="gpt-4o", messages=[])
+    assert client.models == ["gpt-4o"]
+
+
+def test_report_prices_savings_without_baseline_calls_in_stage():
+    client = StubClient({"gpt-4o-mini": completion(tool="search_knowledge"), "o3-mini": completion("final")})
+    router = ModelRouter(client)
+    router.complete(TOOL_SELECTION, messages=[], tools=TOOLS)
+
+    tool_selection = router.report()[TOOL_SELECTION]
+    expected = cost("o3-mini", 100, 10) - cost("gpt-4o-mini", 100, 10)
+    assert tool_selection["cost_saved"] == pytest.approx(expected)
+    assert tool_selection["latency_saved"] is None  # o3-mini has not been timed yet
+
+    router.complete(FINAL_ANSWER, messages=[])
+    report = router.report()
+    assert report[TOOL_SELECTION]["latency_saved"] is not None
+    assert report[FINAL_ANSWER]["cost_saved"] == 0
+
+
+def test_unpriced_model_has_no_cost():
+    router = ModelRouter(StubClient({"local-model": completion("ok")}))
+    router.complete(FINAL_ANSWER, model="local-model", messages=[])
+    assert router.report()[FINAL_ANSWER]["cost_saved"] is None
+
+
+def test_redone_direct_answer_is_extra_cost():
+    # A top-level turn without a tool call: the fast answer is redone on the final-answer model
+    client = StubClient({"gpt-4o-mini": completion("fast answer"), "o3-mini": completion("strong answer")})
+    router = ModelRouter(client)
+    router.complete(TOOL_SELECTION, messages=[], tools=TOOLS)
+    router.complete(FINAL_ANSWER, messages=[], redoes=TOOL_SELECTION)
+
+    report = router.report()
+    assert report[TOOL_SELECTION]["redone"] == 1
+    total_saved = sum(entry["cost_saved"] for entry in report.values())
+    assert total_saved == pytest.approx(-cost("gpt-4o-mini", 100, 10))
+    assert report[TOOL_SELECTION]["latency_saved"] == -report[TOOL_SELECTION]["latency"]
+
+
+def test_escalated_calls_are_not_savings():
+    client = StubClient({"gpt-4o-mini": completion("   "), "o3-mini": completion("ok")})
+    router = ModelRouter(client)
+    router.complete(TOOL_SELECTION, messages=[], tools=TOOLS)
+
+    assert router.report()[TOOL_SELECTION]["cost_saved"] == pytest.approx(-cost("gpt-4o-mini", 100, 10))
+
+
+def test_failed_calls_count_towards_latency(monkeypatch):
+    class SlowFailure(StubClient):
+        def create(self, model, **kwargs):
+            clock[0] += 5.0
+            return super().create(model, **kwargs)
+
+    clock = [0.0]
+    monkeypatch.setattr("src.routing.time.perf_counter", lambda: clock[0])
+    router = ModelRouter(SlowFailure({"gpt-4o-mini": TimeoutError("timed out"), "o3-mini": completion("ok")}))
+    router.complete(TOOL_SELECTION, messages=[], tools=TOOLS)
+
+    report = router.report()[TOOL_SELECTION]
+    assert report["latency"] == 10.0
+    assert report["models"]["gpt-4o-mini"]["latency"] == 5.0
+    # Two attempts for one request the baseline would have answered in one call
+    assert report["latency_saved"] == 5.0 - 10.0
@@ -0,0 +1,60 @@
+import pytest
+from src import semantic_cache
+from src.semantic_cache import SemanticCache
+
+EMBEDDINGS = {
+    "question": [1.0, 0.0, 0.0],
+    "paraphrase": [0.99, 0.05, 0.0],  # similarity ~0.999
+    "related": [0.92, 0.39, 0.0],  # similarity ~0.92
+    "unrelated": [0.0, 1.0, 0.0],
+}
+RESPONSE = {"response": "Answer", "tool_calls": None, "usage": {"prompt_tokens": 10, "total_tokens": 12}}
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticCache(embed=lambda messages: [EMBEDDINGS[message] for message in messages])
+    _, embedding = cache.lookup("question", "config", knowledge_version=1)
+    cache.store(embedding, RESPONSE, "config", knowledge_version=1)
+    return cache
+
+
+def test_paraphrase_hits_with_zero_usage(cache):
+    response, _ = cache.lookup("paraphrase", "config", knowledge_version=1)
+
+    assert response["response"] == "Answer"
+    assert response["cache"]["similarity"] > cache.threshold
+    assert response["usage"] == {"prompt_tokens": 0, "total_tokens": 0}
+    assert RESPONSE["usage"]["total_tokens"] == 12
+    assert cache.stats["hits"] == 1
+
+
+def test_threshold_separates_near_misses_and_misses(cache):
+    assert cache.lookup("related", "config", knowledge_version=1)[0] is None
+    assert cache.lookup("unrelated", "config", knowledge_version=1)[0] is None
+    assert cache.stats["near_misses"] == 1
+    assert cache.stats["misses"] == 2  # including the first lookup of the fixture
+
+
+def test_other_configuration_misses(cache):
+    assert cache.lookup("question", "other config", knowledge_version=1)[0] is None
+
+
+def test_knowledge_change_invalidates(cache):
+    assert cache.lookup("question", "config", knowledge_version=2)[0] is None
+    assert cache.stats["invalidated"] == 1
+    assert cache.lookup("question", "config", knowledge_version=1)[0] is None
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    now = semantic_cache.time.monotonic()
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now + cache.ttl + 1)
+
+    assert cache.lookup("question", "config", knowledge_version=1)[0] is None
+    assert cache.stats["expired"] == 1
+
+
+def test_long_messages_are_not_cached():
+    cache = SemanticCache(embed=lambda messages: pytest.fail("should not embed"), max_message_chars=10)
+    assert cache.lookup("x" * 11, "config") == (None, None)
+    assert cache.stats["skipped"] == 1
@@ -0,0 +1,56 @@
+from src.sharding import gather_results, group_by_shard, shard_for, shard_names
+
+
+def shard_result(hits_per_query):
+    """A `collection.query` result from (id, distance) pairs per query."""
+    return {
+        "ids": [[doc_id for doc_id, _ in hits] for hits in hits_per_query],
+        "documents": [[f"doc {doc_id}" for doc_id, _ in hits] for hits in hits_per_query],
+        "metadatas": [[{} for _ in hits] for hits in hits_per_query],
+        "distances": [[distance for _, distance in hits] for hits in hits_per_query],
+        "embeddings": None,
+    }
+
+
+def test_shard_names():
+    assert shard_names("default_collection", 1) == ["default_collection"]
+    assert shard_names("kb", 3) == ["kb_shard_0", "kb_shard_1", "kb_shard_2"]
+
+
+def test_shard_for_keeps_episodes_together_and_is_stable():
+    shards = {shard_for(f"id{i}", {"episode_number": "42"}, 8) for i in range(20)}
+    assert len(shards) == 1
+    assert shard_for("x", None, 8) == shard_for("x", {"source": "user_input"}, 8)
+    assert all(0 <= shard_for(f"id{i}", None, 5) < 5 for i in range(100))
+
+
+def test_group_by_shard_splits_parallel_lists():
+    documents = [f"doc {i}" for i in range(10)]
+    metadatas = [{"episode_number": str(i % 3)} for i in range(10)]
+    ids = [f"id{i}" for i in range(10)]
+    embeddings = [[float(i)] for i in range(10)]
+
+    groups = group_by_shard(documents, metadatas, ids, 4, embeddings=embeddings)
+
+    assert sorted(doc_id for group in groups.values() for doc_id in group["ids"]) == sorted(ids)
+    for shard, group in groups.items():
+        for doc_id, metadata, embedding in zip(group["ids"], group["metadatas"], group["embeddings"]):
+            assert shard_for(doc_id, metadata, 4) == shard
+            assert embedding == [float(doc_id[2:])]
+
+
+def test_gather_results_takes_global_top_k_per_query():
+    shard_a = shard_result([[("a", 0.1), ("b", 0.5)], [("c", 0.3)]])
+    shard_b = shard_result([[("d", 0.2), ("e", 0.6)], [("f", 0.05), ("g", 0.9)]])
+
+    gathered = gather_results([shard_a, shard_b], n_results=2)
+
+    assert gathered["ids"] == [["a", "d"], ["f", "c"]]
+    assert gathered["distances"] == [[0.1, 0.2], [0.05, 0.3]]
+    assert gathered["documents"] == [["doc a", "doc d"], ["doc f", "doc c"]]
+    assert "embeddings" not in gathered
+
+
+def test_gather_results_with_fewer_hits_than_k():
+    gathered = gather_results([shard_result([[("a", 0.4)]]), shard_result([[]])], n_results=5)
+    assert gathered["ids"] == [["a"]]
@@ -0,0 +1,50 @@
+import pytest
+from src.snapshot import read_snapshot, snapshot_info, write_snapshot
+
+
+class FakeCollection:
+    """Just enough of a Chroma collection for paging through it with `get`."""
+
+    def __init__(self, ids, dimension=4):
+        self.ids = ids
+        self.dimension = dimension
+
+    def count(self):
+        return len(self.ids)
+
+    def get(self, include, limit, offset):
+        ids = self.ids[offset:offset + limit]
+        return {
+            "ids": ids,
+            "documents": [f"doc {doc_id}" for doc_id in ids],
+            "metadatas": [{"episode_number": doc_id, "nested": "ü"} for doc_id in ids],
+            "embeddings": [[float(len(doc_id))] * self.dimension for doc_id in ids],
+            "uris": None,
+        }
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "kb.parquet")
+    collections = [FakeCollection([f"a{i}" for i in range(7)]), FakeCollection([]), FakeCollection(["b10", "b11"])]
+
+    index_params = {"space": "cosine", "M": 32}
+    assert write_snapshot(path, collections, embedding_model="test-model", batch_size=3,
+                          index_params=index_params) == 9
+
+    info = snapshot_info(path)
+    assert (info["embedding_model"], info["dimension"]) == ("test-model", "4")
+    assert info["index_params"] == index_params
+
+    batches = list(read_snapshot(path, batch_size=4))
+    assert [len(batch["ids"]) for batch in batches] == [4, 4, 1]
+    rows = {doc_id: (doc, meta, emb) for batch in batches
+            for doc_id, doc, meta, emb in zip(batch["ids"], batch["documents"], batch["metadatas"], batch["embeddings"])}
+    assert rows["b11"] == ("doc b11", {"episode_number": "b11", "nested": "ü"}, [3.0] * 4)
+    assert len(rows) == 9
+
+
+def test_empty_collection_is_an_error(tmp_path):
+    path = tmp_path / "empty.parquet"
+    with pytest.raises(ValueError):
+        write_snapshot(str(path), [FakeCollection([])], embedding_model="test-model")
+    assert not path.exists()
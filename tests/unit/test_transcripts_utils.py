@@ -0,0 +1,86 @@
+import os
+import pytest
+from docx import Document
+from src.scripts.transcripts_utils import get_files, iter_files
+
+
+def write_transcript(folder, name, text):
+    document = Document()
+    for paragraph in text.split("\n"):
+        document.add_paragraph(paragraph)
+    path = os.path.join(folder, name)
+    document.save(path)
+    return path
+
+
+@pytest.fixture
+def transcripts(tmp_path):
+    folder = tmp_path / "transcripts"
+    folder.mkdir()
+    paths = [
+        write_transcript(folder, "#1 – First episode.docx", "Hello\nWorld"),
+        write_transcript(folder, "#2 – Second episode.docx", "Another one"),
+    ]
+    return str(folder), paths
+
+
+def by_episode(transcripts):
+    return sorted(transcripts, key=lambda transcript: transcript["episode_number"])
+
+
+def corrupt_keeping_size_and_mtime(path):
+    stat = os.stat(path)
+    with open(path, "wb") as f:
+        f.write(b"\0" * stat.st_size)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_iter_files_parses_every_transcript(transcripts, tmp_path):
+    folder, _ = transcripts
+    parsed = by_episode(iter_files(folder, max_workers=1, cache_dir=str(tmp_path / "cache")))
+
+    assert parsed == [
+        {"episode_number": "1", "episode_title": "First episode", "content": "Hello\nWorld"},
+        {"episode_number": "2", "episode_title": "Second episode", "content": "Another one"},
+    ]
+
+
+def test_cache_hit_skips_parsing(transcripts, tmp_path):
+    folder, paths = transcripts
+    cache_dir = str(tmp_path / "cache")
+    first = by_episode(iter_files(folder, max_workers=1, cache_dir=cache_dir))
+
+    # The file can no longer be parsed, so the result must come from the cache
+    corrupt_keeping_size_and_mtime(paths[0])
+    assert by_episode(iter_files(folder, max_workers=1, cache_dir=cache_dir)) == first
+
+
+def test_changed_file_is_parsed_again(transcripts, tmp_path):
+    folder, paths = transcripts
+    cache_dir = str(tmp_path / "cache")
+    list(iter_files(folder, max_workers=1, cache_dir=cache_dir))
+
+    write_transcript(folder, os.path.basename(paths[0]), "Edited transcript with more words")
+    stat = os.stat(paths[0])
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    parsed = by_episode(iter_files(folder, max_workers=1, cache_dir=cache_dir))
+    assert parsed[0]["content"] == "Edited transcript with more words"
+
+
+def test_unreadable_files_are_skipped(transcripts, tmp_path, capsys):
+    folder, _ = transcripts
+    (tmp_path / "transcripts" / "#3 – Broken.docx").write_bytes(b"not a docx")
+
+    parsed = list(iter_files(folder, max_workers=1, cache_dir=str(tmp_path / "cache")))
+
+    assert sorted(transcript["episode_number"] for transcript in parsed) == ["1", "2"]
+    assert "Error reading file #3 – Broken.docx" in capsys.readouterr().out
+
+
+def test_get_files_returns_the_same_list_without_caching(transcripts, tmp_path, monkeypatch):
+    folder, _ = transcripts
+    monkeypatch.chdir(tmp_path)
+
+    assert by_episode(get_files(folder)) == by_episode(iter_files(folder, max_workers=1, cache_dir=None))
+    assert not os.path.exists(tmp_path / ".transcript_cache")
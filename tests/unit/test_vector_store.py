@@ -0,0 +1,130 @@
+import threading
+import chromadb
+import pytest
+from chromadb.config import Settings
+from src import vector_store
+from src.snapshot import iter_collection
+from src.vector_store import VectorStore
+
+DOCUMENTS = ["alpha", "beta", "gamma", "delta"]
+EMBEDDINGS = [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, 0.5]]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = chromadb.EphemeralClient(Settings(allow_reset=True, anonymized_telemetry=False))
+    client.reset()
+    monkeypatch.setattr(vector_store.chromadb, "PersistentClient", lambda path: client)
+    monkeypatch.setattr(vector_store, "CHROMA_HOST", None)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return client
+
+
+def add(store, start=0, stop=len(DOCUMENTS)):
+    store.add_documents(DOCUMENTS[start:stop], ids=[str(i) for i in range(start, stop)],
+                        embeddings=EMBEDDINGS[start:stop])
+
+
+def test_rebuild_keeps_documents(client):
+    store = VectorStore()
+    add(store)
+
+    assert store.rebuild_shard(0) == len(DOCUMENTS)
+    assert store.default_collection.count() == len(DOCUMENTS)
+    assert [c.name for c in client.list_collections()] == ["default_collection"]
+
+
+def test_writes_wait_for_a_rebuild(client, monkeypatch):
+    store = VectorStore()
+    add(store, stop=3)
+    writer = threading.Thread(target=add, args=(store, 3))
+    iter_collection = vector_store.iter_collection
+
+    def copy_while_writing(*args, **kwargs):
+        writer.start()
+        writer.join(timeout=0.2)
+        assert writer.is_alive(), "the write should wait for the rebuild"
+        yield from iter_collection(*args, **kwargs)
+
+    monkeypatch.setattr(vector_store, "iter_collection", copy_while_writing)
+    store.rebuild_shard(0)
+    writer.join()
+
+    assert store.default_collection.count() == len(DOCUMENTS)
+
+
+@pytest.mark.parametrize("num_shards", [1, 2])
+def test_interrupted_rebuild_is_finished_on_open(client, num_shards):
+    store = VectorStore(num_shards=num_shards)
+    add(store)
+    # Stop a rebuild after deleting the shard, before renaming the copy
+    shard = max(store.default_shards, key=lambda shard: shard.count())
+    name, count = shard.name, shard.count()
+    copy = client.create_collection(f"{name}_rebuild")
+    for batch in iter_collection(shard):
+        copy.add(**batch)
+    client.delete_collection(name)
+
+    store = VectorStore(num_shards=num_shards)
+
+    assert client.get_collection(name).count() == count
+    assert store.version() == len(DOCUMENTS)
+
+
+def test_failed_copy_leftover_is_not_a_layout_error(client):
+    store = VectorStore()
+    add(store)
+    client.create_collection("default_collection_rebuild").add(ids=["0"], embeddings=[EMBEDDINGS[0]])
+
+    assert VectorStore().version() == len(DOCUMENTS)
+
+
+def test_data_under_another_layout_is_an_error(client):
+    add(VectorStore())
+    with pytest.raises(ValueError, match="num_shards=2"):
+        VectorStore(num_shards=2)
+
+
+def segment_params(client, collection):
+    """The HNSW settings Chroma built the index with, not the collection metadata."""
+    segments = client._server._sysdb.get_segments(collection=collection.id)
+    vector_segment = next(segment for segment in segments if segment["scope"].name == "VECTOR")
+    return vector_store.index_params_from_metadata(vector_segment["metadata"])
+
+
+def test_reopening_keeps_index_settings(client):
+    VectorStore(index_params={"space": "cosine", "M": 32})
+    store = VectorStore()
+    assert store.index_params() == {"space": "cosine", "M": 32}
+
+    add(store)
+    store.rebuild_shard(0)
+    assert segment_params(client, store.default_collection) == {"space": "cosine", "M": 32}
+
+
+def test_snapshot_import_recreates_the_index_with_its_settings(client, tmp_path):
+    store = VectorStore(index_params={"space": "cosine"})
+    add(store)
+    path = str(tmp_path / "snapshot.parquet")
+    store.export_snapshot(path)
+    client.reset()
+
+    store = VectorStore()
+    assert store.import_snapshot(path) == len(DOCUMENTS)
+
+    assert segment_params(client, store.default_collection) == {"space": "cosine"}
+    assert store.index_params() == {"space": "cosine"}
+    assert store.default_collection.count() == len(DOCUMENTS)
+
+
+def test_snapshot_import_refuses_different_index_settings(client, tmp_path):
+    store = VectorStore(index_params={"space": "cosine"})
+    add(store)
+    path = str(tmp_path / "snapshot.parquet")
+    store.export_snapshot(path)
+    client.reset()
+
+    store = VectorStore(index_params={"space": "ip"})
+    add(store, stop=1)
+    with pytest.raises(ValueError, match="index settings"):
+        store.import_snapshot(path)